@@ -2,11 +2,12 @@ from datetime import timedelta
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password
-from app.core.deps import get_db
+from app.core.security import create_access_token, verify_password_async
+from app.core.deps import get_db, invalidate_principal
 from app.models.models import User
 from app.schemas.schemas import Token
 
@@ -14,19 +15,27 @@ router = APIRouter()
 
 @router.post("/login", response_model=Token)
 async def login(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     form_data: OAuth2PasswordRequestForm = Depends()
 ) -> Any:
     """
     OAuth2 compatible token login, get an access token for future requests
     """
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    user = await db.scalar(select(User).filter(User.email == form_data.username))
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_password_async(form_data.password, user.password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash uses an outdated bcrypt cost
+        user.password = new_hash
+        await db.commit()
+        await invalidate_principal(user.email)
     
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -1,48 +1,283 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from sqlalchemy.orm import Session
-import os
-from pathlib import Path
+import csv
+import io
+import tempfile
+from itertools import islice
+from typing import Any, Iterator, List, Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
+from pydantic import ValidationError
+from sqlalchemy import select, func, insert, literal_column, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
-from app.core.deps import get_db, get_current_active_user, get_current_farmer_user
-from app.models.models import Crop, User
-from app.schemas.schemas import Crop as CropSchema, CropCreate, CropUpdate
+from app.core.config import settings
+from app.core.deps import get_db, get_read_db, get_current_active_user, get_current_farmer_user
+from app.core.pagination import paginate, set_next_cursor
+from app.core.response_cache import CROP_LIST, FARMERS, crop_responses, crop_scope, invalidate_crops
+from app.core.serialization import crop_list, crop_search_results, dump_rows, json_rows
+from app.core.uploads import make_variants, save_upload, variant_urls
+from app.db import loaders, stock, user_stats
+from app.db.projection import CROPS, Projection, projection_params
+from app.models.models import Crop, User, search_document
+from app.schemas.schemas import Crop as CropSchema, CropCreate, CropUpdate, CropSearchResults, CropImportResults
 
 router = APIRouter()
 
+# The cached crop reads stay on the primary (get_db): a page rebuilt from a
+# lagging replica right after an invalidation would be cached as current.
 @router.get("/", response_model=List[CropSchema])
 async def read_crops(
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(CROPS)),
 ) -> Any:
     """
-    Retrieve crops.
+    Retrieve crops. Pages are cached until a published crop changes; send the
+    ETag back in If-None-Match to get a 304 when the page is unchanged. With
+    `fields` or `expand`, rows are flat and farmers are side-loaded.
     """
-    crops = db.query(Crop).filter(Crop.published_to_marketplace == True).offset(skip).limit(limit).all()
-    return crops
+    shape = ("fields", *projection.cache_key()) if projection is not None else ()
+    key = await crop_responses.key([CROP_LIST], "list", skip, limit, cursor, *shape)
+    cached = await crop_responses.get(request, key)
+    if cached is not None:
+        return cached
+    query = select(Crop).filter(Crop.published_to_marketplace == True)
+    if projection is not None:
+        rows = (await db.execute(paginate(projection.select(query), Crop, skip, limit, cursor))).all()
+        set_next_cursor(response, rows, limit, cursor)
+        body = (await projection.page(db, rows)).body
+    else:
+        crops = (await db.scalars(paginate(query.options(*loaders.CROP_LIST), Crop, skip, limit, cursor))).all()
+        set_next_cursor(response, crops, limit, cursor)
+        body = dump_rows(crop_list, crops)
+    return await crop_responses.set(request, key, body, headers=dict(response.headers))
+
+@router.get("/search", response_model=CropSearchResults)
+async def search_crops(
+    db: AsyncSession = Depends(get_read_db),
+    q: Optional[str] = None,
+    category: Optional[List[str]] = Query(None),
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    unit: Optional[str] = None,
+    sort: Optional[Literal["relevance", "newest", "price_asc", "price_desc"]] = None,
+    skip: int = 0,
+    limit: int = 20,
+    current_user: User = Depends(get_current_active_user),
+) -> Any:
+    """
+    Search published crops by text, category, price range and unit.
+    Category counts ignore the category filter, so every option can show its count.
+    """
+    conditions = [Crop.published_to_marketplace == True]
+    if min_price is not None:
+        conditions.append(Crop.price >= min_price)
+    if max_price is not None:
+        conditions.append(Crop.price <= max_price)
+    if unit:
+        conditions.append(Crop.unit == unit)
+
+    rank = None
+    if q and q.strip():
+        if db.bind.dialect.name == "postgresql":
+            document = search_document(Crop.name, Crop.description)
+            ts_query = func.websearch_to_tsquery(literal_column("'english'"), q)
+            conditions.append(document.op("@@")(ts_query))
+            rank = func.ts_rank(document, ts_query)
+        else:
+            # No tsvector outside PostgreSQL: every word must appear in the name or description
+            for word in q.split():
+                conditions.append(or_(Crop.name.icontains(word, autoescape=True), Crop.description.icontains(word, autoescape=True)))
+
+    facet_rows = await db.execute(
+        select(Crop.category, func.count(Crop.id)).filter(*conditions).group_by(Crop.category).order_by(Crop.category)
+    )
+    categories = [{"category": name, "count": count} for name, count in facet_rows]
+    if category:
+        conditions.append(Crop.category.in_(category))
+    total = sum(facet["count"] for facet in categories if not category or facet["category"] in category)
+
+    sort = sort or ("relevance" if rank is not None else "newest")
+    order_by = {
+        "relevance": [rank.desc()] if rank is not None else [],
+        "newest": [],
+        "price_asc": [Crop.price.asc()],
+        "price_desc": [Crop.price.desc()],
+    }[sort] + [Crop.created_at.desc(), Crop.id.desc()]
+    query = select(Crop).options(*loaders.CROP_LIST).filter(*conditions).order_by(*order_by).offset(skip).limit(limit)
+    crops = (await db.scalars(query)).all()
+    return json_rows(crop_search_results, {"items": crops, "total": total, "categories": categories})
 
 @router.post("/", response_model=CropSchema)
 async def create_crop(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     crop_in: CropCreate,
     current_user: User = Depends(get_current_farmer_user),
 ) -> Any:
     """
     Create new crop. Only farmers can create crops.
     """
-    crop = Crop(**crop_in.model_dump(), farmer_id=current_user.id)
+    crop = Crop(**crop_in.model_dump(exclude={"farmer_id"}), farmer_id=current_user.id)
     db.add(crop)
-    db.commit()
-    db.refresh(crop)
-    return crop
+    await user_stats.bump(db, current_user.id, total_crops=1)
+    await db.commit()
+    await invalidate_crops(crop.id, listed=crop.published_to_marketplace)
+    return await loaders.reload(db, crop, loaders.CROP_DETAIL)
+
+# CSV uploads are spooled to disk past this size instead of held in memory
+CSV_SPOOL_SIZE = 1024 * 1024
+
+async def _import_source(request: Request) -> Iterator[Any]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type == "application/json":
+        try:
+            rows = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Body is not valid JSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a JSON array of crops")
+        return iter(rows)
+    if content_type == "text/csv":
+        spool = tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_SIZE)
+        async for chunk in request.stream():
+            await run_in_threadpool(spool.write, chunk)
+        spool.seek(0)
+        reader = csv.DictReader(io.TextIOWrapper(spool, encoding="utf-8-sig", newline=""))
+        # Empty cells are missing values; cells beyond the header are dropped
+        return ({key: value for key, value in row.items() if key is not None and value != ""} for row in reader)
+    raise HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Send crops as application/json or text/csv"
+    )
+
+def _read_chunk(rows: Iterator[Any], size: int) -> List[Any]:
+    try:
+        return list(islice(rows, size))
+    except (csv.Error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid CSV: {e}")
+
+def _validate_row(raw: Any, farmer_id: int):
+    """
+    Returns (crop id or None, column values) for a valid row; raises
+    ValueError carrying the row's errors otherwise.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError([{"type": "model_type", "loc": [], "msg": "Expected an object"}])
+    crop_id = raw.get("id")
+    if crop_id is not None:
+        try:
+            crop_id = int(crop_id)
+        except (TypeError, ValueError):
+            raise ValueError([{"type": "int_parsing", "loc": ["id"], "msg": "Input should be a valid integer"}])
+    try:
+        crop_in = CropCreate.model_validate({**raw, "farmer_id": farmer_id})
+    except ValidationError as e:
+        raise ValueError(e.errors(include_url=False, include_context=False, include_input=False))
+    if crop_id is None:
+        return None, crop_in.model_dump()
+    # Updates only touch the columns the row provides, e.g. an existing photo is kept
+    return crop_id, crop_in.model_dump(include=crop_in.model_fields_set - {"farmer_id"})
+
+@router.post("/bulk", response_model=CropImportResults)
+async def import_crops(
+    *,
+    db: AsyncSession = Depends(get_db),
+    request: Request,
+    current_user: User = Depends(get_current_farmer_user),
+) -> Any:
+    """
+    Create or update many crops at once from a JSON array or a CSV file with a
+    header row (Content-Type application/json or text/csv). Rows are validated
+    like POST /crops/; rows with an `id` replace that crop, the others are
+    created. Each chunk of rows is written with one multi-row INSERT and one
+    bulk UPDATE, and valid rows are saved even when others fail. `row` in the
+    results is the 1-based position of the row in the upload.
+    """
+    rows = await _import_source(request)
+    results = []
+    changed = []
+    created = 0
+    position = 0
+    while chunk := await run_in_threadpool(_read_chunk, rows, settings.CROP_IMPORT_CHUNK_SIZE):
+        if position + len(chunk) > settings.CROP_IMPORT_MAX_ROWS:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.CROP_IMPORT_MAX_ROWS} crops per import"
+            )
+        inserts, updates = [], []
+        for raw in chunk:
+            position += 1
+            try:
+                crop_id, values = _validate_row(raw, current_user.id)
+            except ValueError as e:
+                results.append({"row": position, "status": "failed", "errors": e.args[0]})
+                continue
+            if crop_id is None:
+                inserts.append((position, values))
+            else:
+                updates.append((position, {**values, "id": crop_id}))
+
+        if updates:
+            # Lock the crops being replaced so reservations can't change under the quantity check
+            existing = {
+                row.id: row for row in await db.execute(
+                    select(Crop.id, Crop.farmer_id, Crop.reserved_quantity)
+                    .filter(Crop.id.in_({values["id"] for _, values in updates}))
+                    .with_for_update()
+                )
+            }
+            valid = []
+            for row, values in updates:
+                crop = existing.get(values["id"])
+                if crop is None:
+                    error = "Crop not found"
+                elif crop.farmer_id != current_user.id:
+                    error = "Not enough permissions"
+                elif values["quantity"] < crop.reserved_quantity:
+                    error = "Quantity is below the quantity reserved by pending orders"
+                else:
+                    valid.append(values)
+                    results.append({"row": row, "status": "updated", "id": values["id"]})
+                    continue
+                results.append({"row": row, "status": "failed", "id": values["id"], "errors": [{"loc": ["id"], "msg": error}]})
+            if valid:
+                await db.execute(update(Crop), valid)
+                changed.extend(values["id"] for values in valid)
+
+        if inserts:
+            # PostgreSQL matches RETURNING rows to parameters within batched INSERTs. SQLite
+            # can't, so it would fall back to an INSERT per row; instead rely on it
+            # assigning ascending rowids in parameter order.
+            postgres = db.bind.dialect.name == "postgresql"
+            ids = (await db.scalars(
+                insert(Crop).returning(Crop.id, sort_by_parameter_order=postgres),
+                [values for _, values in inserts],
+            )).all()
+            if not postgres:
+                ids = sorted(ids)
+            results.extend({"row": row, "status": "created", "id": crop_id} for (row, _), crop_id in zip(inserts, ids))
+            created += len(ids)
+            changed.extend(ids)
+
+    if created:
+        await user_stats.bump(db, current_user.id, total_crops=created)
+    await db.commit()
+    if changed:
+        await invalidate_crops(*changed)
+
+    results.sort(key=lambda result: result["row"])
+    counts = {name: sum(result["status"] == name for result in results) for name in ("created", "updated", "failed")}
+    return {**counts, "rows": results}
 
 @router.put("/{crop_id}", response_model=CropSchema)
 async def update_crop(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     crop_id: int,
     crop_in: CropUpdate,
     current_user: User = Depends(get_current_farmer_user),
@@ -50,7 +285,7 @@ async def update_crop(
     """
     Update a crop. Only the farmer who created it can update it.
     """
-    crop = db.query(Crop).filter(Crop.id == crop_id).first()
+    crop = await db.scalar(select(Crop).filter(Crop.id == crop_id))
     if not crop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -62,44 +297,69 @@ async def update_crop(
             detail="Not enough permissions"
         )
     
-    for field, value in crop_in.model_dump(exclude_unset=True).items():
+    was_listed = crop.published_to_marketplace
+    update_data = crop_in.model_dump(exclude_unset=True)
+    # Stock is set atomically, so it can't drop below what pending orders hold
+    if "quantity" in update_data and not await stock.set_quantity(db, crop_id, update_data.pop("quantity")):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Quantity is below the quantity reserved by pending orders"
+        )
+    for field, value in update_data.items():
         setattr(crop, field, value)
     
     db.add(crop)
-    db.commit()
-    db.refresh(crop)
-    return crop
+    await db.commit()
+    await invalidate_crops(crop_id, listed=was_listed or crop.published_to_marketplace)
+    return await loaders.reload(db, crop, loaders.CROP_DETAIL)
 
 @router.get("/{crop_id}", response_model=CropSchema)
 async def read_crop(
     *,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
     crop_id: int,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(CROPS)),
 ) -> Any:
     """
-    Get crop by ID.
+    Get crop by ID. Cached like GET /crops/, with an ETag.
     """
-    crop = db.query(Crop).filter(Crop.id == crop_id).first()
+    shape = ("fields", *projection.cache_key()) if projection is not None else ()
+    key = await crop_responses.key([FARMERS, crop_scope(crop_id)], "crop", crop_id, *shape)
+    cached = await crop_responses.get(request, key)
+    if cached is not None:
+        return cached
+    query = select(Crop).filter(Crop.id == crop_id)
+    if projection is not None:
+        crop = (await db.execute(projection.select(query))).first()
+    else:
+        crop = await db.scalar(query.options(*loaders.CROP_DETAIL))
     if not crop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Crop not found"
         )
-    return crop
+    if projection is not None:
+        body = (await projection.item(db, crop)).body
+    else:
+        body = CropSchema.model_validate(crop).model_dump_json().encode()
+    return await crop_responses.set(request, key, body)
 
 @router.post("/{crop_id}/photo")
 async def upload_crop_photo(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     crop_id: int,
     file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
     current_user: User = Depends(get_current_farmer_user),
 ) -> Any:
     """
     Upload a photo for a crop. Only the farmer who created it can upload photos.
+    Resized WebP variants are generated in the background after the response.
     """
-    crop = db.query(Crop).filter(Crop.id == crop_id).first()
+    crop = await db.scalar(select(Crop).filter(Crop.id == crop_id))
     if not crop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -111,22 +371,18 @@ async def upload_crop_photo(
             detail="Not enough permissions"
         )
     
-    # Create uploads directory if it doesn't exist
-    upload_dir = Path("uploads")
-    upload_dir.mkdir(exist_ok=True)
-    
-    # Save the file
-    file_extension = os.path.splitext(file.filename)[1]
-    file_name = f"crop_{crop_id}{file_extension}"
-    file_path = upload_dir / file_name
-    
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Save the file under its content hash; identical photos share one file
+    file_path = await save_upload(file)
+    background_tasks.add_task(make_variants, file_path)
     
     # Update crop photo path
-    crop.photo = f"/uploads/{file_name}"
+    crop.photo = f"/uploads/{file_path.name}"
     db.add(crop)
-    db.commit()
+    await db.commit()
+    await invalidate_crops(crop_id, listed=crop.published_to_marketplace)
     
-    return {"message": "Photo uploaded successfully", "photo_path": crop.photo} 
\ No newline at end of file
+    return {
+        "message": "Photo uploaded successfully",
+        "photo_path": crop.photo,
+        "variants": variant_urls(crop.photo),
+    } 
\ No newline at end of file
@@ -1,83 +1,162 @@
-from typing import Any, Dict
+from typing import Any, Dict, List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import select, func, and_, literal, null, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_current_active_user
-from app.models.models import User, Crop, Order, Review
+from app.core.deps import get_read_db, get_current_active_user
+from app.db import loaders
+from app.db.user_stats import COUNTERS, ORDER_STATUSES, status_counter
+from app.models.models import User, Crop, Order, Review, UserStats
+from app.schemas.schemas import Order as OrderSchema, Review as ReviewSchema
 
 router = APIRouter()
 
+def _count(model, *criteria):
+    return select(func.count(model.id)).filter(*criteria).scalar_subquery()
+
+async def _recent(db: AsyncSession, model, query, options, schema) -> List[Any]:
+    # Five rows: a single joined SELECT is cheaper than one selectin query per relationship
+    rows = await db.scalars(query.options(*options).order_by(model.created_at.desc()).limit(5))
+    return [schema.model_validate(row) for row in rows]
+
+async def _user_stats(db: AsyncSession, user: User) -> UserStats:
+    # Primary-key lookup of the counters maintained by app.db.user_stats
+    stats = await db.get(UserStats, user.id)
+    if stats is None:
+        stats = UserStats(user_id=user.id, **{name: 0 for name in COUNTERS})
+    return stats
+
+def _number(value) -> Any:
+    # Decimal aggregates (exact revenue, PostgreSQL's avg) go out as JSON numbers like Money fields
+    return float(value) if value is not None else None
+
+def _counter_analytics(stats: UserStats) -> Dict[str, Any]:
+    return {
+        "orders_by_status": [
+            (status, getattr(stats, status_counter(status)))
+            for status in ORDER_STATUSES
+            if getattr(stats, status_counter(status))
+        ],
+        "average_rating": stats.rating_sum / stats.total_reviews if stats.total_reviews else None,
+        "revenue": _number(stats.revenue) if stats.total_orders else None,
+    }
+
+async def _analytics(db: AsyncSession, orders, crops=None, reviews=None) -> Dict[str, Any]:
+    """
+    Answer all analytics aggregates in one round-trip.
+
+    Each aggregate is a SELECT producing (metric, key, count, value) rows and the
+    selects are glued together with UNION ALL, so the tables are scanned once per
+    metric in a single statement instead of once per query.
+    """
+    # The value column is untyped (the first select's) so every metric keeps the
+    # database's own type: revenue is an exact NUMERIC sum, not a Python loop
+    parts = [
+        orders.with_only_columns(
+            literal("orders_by_status"), Order.status, func.count(Order.id), null()
+        ).group_by(Order.status),
+        orders.with_only_columns(
+            literal("revenue"), null(), func.count(Order.id), func.sum(Order.total_price)
+        ),
+    ]
+    if crops is not None:
+        parts.append(crops.with_only_columns(
+            literal("crops_by_category"), Crop.category, func.count(Crop.id), null()
+        ).group_by(Crop.category))
+    if reviews is not None:
+        parts.append(reviews.with_only_columns(
+            literal("average_rating"), null(), func.count(Review.id), func.avg(Review.rating)
+        ))
+
+    analytics = {"orders_by_status": [], "crops_by_category": [], "average_rating": None, "revenue": None}
+    for metric, key, count, value in (await db.execute(union_all(*parts))).all():
+        if metric == "average_rating":
+            analytics["average_rating"] = _number(value)
+        elif metric == "revenue":
+            analytics["revenue"] = _number(value)
+        else:
+            analytics[metric].append((key, count))
+    return analytics
+
 @router.get("/stats")
 async def get_dashboard_stats(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Dict[str, Any]:
     """
     Get dashboard statistics. Different stats based on user role.
     """
     if current_user.role == "admin":
-        return {
-            "total_users": db.query(func.count(User.id)).scalar(),
-            "total_farmers": db.query(func.count(User.id)).filter(User.role == "farmer").scalar(),
-            "total_buyers": db.query(func.count(User.id)).filter(User.role == "buyer").scalar(),
-            "total_crops": db.query(func.count(Crop.id)).scalar(),
-            "total_orders": db.query(func.count(Order.id)).scalar(),
-            "total_reviews": db.query(func.count(Review.id)).scalar(),
-            "recent_orders": db.query(Order).order_by(Order.created_at.desc()).limit(5).all(),
-            "recent_reviews": db.query(Review).order_by(Review.created_at.desc()).limit(5).all(),
-        }
+        user_counts = select(
+            func.count(User.id).label("total_users"),
+            func.count(User.id).filter(User.role == "farmer").label("total_farmers"),
+            func.count(User.id).filter(User.role == "buyer").label("total_buyers"),
+        ).cte("user_counts")
+        counts = (await db.execute(select(
+            user_counts,
+            _count(Crop).label("total_crops"),
+            _count(Order).label("total_orders"),
+            _count(Review).label("total_reviews"),
+        ))).one()
+        orders = select(Order)
+        reviews = select(Review)
+        counts = counts._asdict()
     elif current_user.role == "farmer":
-        return {
-            "total_crops": db.query(func.count(Crop.id)).filter(Crop.farmer_id == current_user.id).scalar(),
-            "total_orders": db.query(func.count(Order.id)).join(Crop).filter(Crop.farmer_id == current_user.id).scalar(),
-            "total_reviews": db.query(func.count(Review.id)).filter(Review.farmer_id == current_user.id).scalar(),
-            "recent_orders": db.query(Order).join(Crop).filter(Crop.farmer_id == current_user.id).order_by(Order.created_at.desc()).limit(5).all(),
-            "recent_reviews": db.query(Review).filter(Review.farmer_id == current_user.id).order_by(Review.created_at.desc()).limit(5).all(),
+        stats = await _user_stats(db, current_user)
+        counts = {
+            "total_crops": stats.total_crops,
+            "total_orders": stats.total_orders,
+            "total_reviews": stats.total_reviews,
         }
+        orders = select(Order).join(Crop).filter(Crop.farmer_id == current_user.id)
+        reviews = select(Review).filter(Review.farmer_id == current_user.id)
     else:  # buyer
-        return {
-            "total_orders": db.query(func.count(Order.id)).filter(Order.buyer_id == current_user.id).scalar(),
-            "total_reviews": db.query(func.count(Review.id)).filter(Review.buyer_id == current_user.id).scalar(),
-            "recent_orders": db.query(Order).filter(Order.buyer_id == current_user.id).order_by(Order.created_at.desc()).limit(5).all(),
-            "recent_reviews": db.query(Review).filter(Review.buyer_id == current_user.id).order_by(Review.created_at.desc()).limit(5).all(),
+        stats = await _user_stats(db, current_user)
+        counts = {
+            "total_orders": stats.total_orders,
+            "total_reviews": stats.total_reviews,
         }
+        orders = select(Order).filter(Order.buyer_id == current_user.id)
+        reviews = select(Review).filter(Review.buyer_id == current_user.id)
+
+    return {
+        **counts,
+        "recent_orders": await _recent(db, Order, orders, loaders.ORDER_DETAIL, OrderSchema),
+        "recent_reviews": await _recent(db, Review, reviews, loaders.REVIEW_DETAIL, ReviewSchema),
+    }
 
 @router.get("/analytics")
 async def get_dashboard_analytics(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_active_user),
 ) -> Dict[str, Any]:
     """
     Get dashboard analytics. Different analytics based on user role.
     """
     if current_user.role == "admin":
+        analytics = await _analytics(db, select(Order), select(Crop), select(Review))
         return {
-            "orders_by_status": db.query(
-                Order.status, func.count(Order.id)
-            ).group_by(Order.status).all(),
-            "average_rating": db.query(func.avg(Review.rating)).scalar(),
-            "total_revenue": db.query(func.sum(Order.total_price)).scalar(),
-            "crops_by_category": db.query(
-                Crop.category, func.count(Crop.id)
-            ).group_by(Crop.category).all(),
+            "orders_by_status": analytics["orders_by_status"],
+            "average_rating": analytics["average_rating"],
+            "total_revenue": analytics["revenue"],
+            "crops_by_category": analytics["crops_by_category"],
         }
     elif current_user.role == "farmer":
+        analytics = _counter_analytics(await _user_stats(db, current_user))
         return {
-            "orders_by_status": db.query(
-                Order.status, func.count(Order.id)
-            ).join(Crop).filter(Crop.farmer_id == current_user.id).group_by(Order.status).all(),
-            "average_rating": db.query(func.avg(Review.rating)).filter(Review.farmer_id == current_user.id).scalar(),
-            "total_revenue": db.query(func.sum(Order.total_price)).join(Crop).filter(Crop.farmer_id == current_user.id).scalar(),
-            "crops_by_category": db.query(
-                Crop.category, func.count(Crop.id)
-            ).filter(Crop.farmer_id == current_user.id).group_by(Crop.category).all(),
+            "orders_by_status": analytics["orders_by_status"],
+            "average_rating": analytics["average_rating"],
+            "total_revenue": analytics["revenue"],
+            "crops_by_category": [
+                (category, count) for category, count in await db.execute(
+                    select(Crop.category, func.count(Crop.id)).filter(Crop.farmer_id == current_user.id).group_by(Crop.category)
+                )
+            ],
         }
     else:  # buyer
+        analytics = _counter_analytics(await _user_stats(db, current_user))
         return {
-            "orders_by_status": db.query(
-                Order.status, func.count(Order.id)
-            ).filter(Order.buyer_id == current_user.id).group_by(Order.status).all(),
-            "average_rating": db.query(func.avg(Review.rating)).filter(Review.buyer_id == current_user.id).scalar(),
-            "total_spent": db.query(func.sum(Order.total_price)).filter(Order.buyer_id == current_user.id).scalar(),
-        } 
\ No newline at end of file
+            "orders_by_status": analytics["orders_by_status"],
+            "average_rating": analytics["average_rating"],
+            "total_spent": analytics["revenue"],
+        }
@@ -1,35 +1,56 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 
-from app.core.deps import get_db, get_current_active_user, get_current_buyer_user, get_current_farmer_user
-from app.models.models import Order, Crop, User
-from app.schemas.schemas import Order as OrderSchema, OrderCreate, OrderUpdate
+from app.core.deps import get_db, get_read_db, get_current_active_user, get_current_buyer_user, get_current_farmer_user
+from app.core.pagination import paginate, set_next_cursor
+from app.core.response_cache import invalidate_crops
+from app.core.serialization import json_rows, order_list
+from app.db import loaders, stock, user_stats
+from app.db.projection import ORDERS, Projection, projection_params
+from app.models.models import Order, Crop, User, order_total
+from app.schemas.schemas import Order as OrderSchema, OrderCreate, OrderUpdate, CartCheckout
 
 router = APIRouter()
 
+ORDER_COLUMNS = ("quantity", "unit_price", "total_price", "status", "buyer_id", "crop_id", "reserved_until")
+
 @router.get("/", response_model=List[OrderSchema])
 async def read_orders(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(ORDERS)),
 ) -> Any:
     """
-    Retrieve orders. Users can only see their own orders.
+    Retrieve orders. Users can only see their own orders. With `fields` or
+    `expand`, rows are flat and related objects are side-loaded (see
+    app.db.projection).
     """
     if current_user.role == "admin":
-        orders = db.query(Order).offset(skip).limit(limit).all()
+        query = select(Order)
     elif current_user.role == "farmer":
-        orders = db.query(Order).join(Crop).filter(Crop.farmer_id == current_user.id).offset(skip).limit(limit).all()
+        query = select(Order).join(Crop).filter(Crop.farmer_id == current_user.id)
     else:  # buyer
-        orders = db.query(Order).filter(Order.buyer_id == current_user.id).offset(skip).limit(limit).all()
-    return orders
+        query = select(Order).filter(Order.buyer_id == current_user.id)
+    if projection is not None:
+        rows = (await db.execute(paginate(projection.select(query), Order, skip, limit, cursor))).all()
+        set_next_cursor(response, rows, limit, cursor)
+        return await projection.page(db, rows, response)
+    query = query.options(*loaders.ORDER_LIST)
+    orders = (await db.scalars(paginate(query, Order, skip, limit, cursor))).all()
+    set_next_cursor(response, orders, limit, cursor)
+    return json_rows(order_list, orders, response)
 
 @router.post("/", response_model=OrderSchema)
 async def create_order(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     order_in: OrderCreate,
     current_user: User = Depends(get_current_buyer_user),
 ) -> Any:
@@ -37,7 +58,7 @@ async def create_order(
     Create new order. Only buyers can create orders.
     """
     # Check if crop exists and is available
-    crop = db.query(Crop).filter(Crop.id == order_in.crop_id).first()
+    crop = await db.scalar(select(Crop).filter(Crop.id == order_in.crop_id))
     if not crop:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -48,23 +69,102 @@ async def create_order(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Crop is not available in marketplace"
         )
-    if crop.quantity < order_in.quantity:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Not enough quantity available"
-        )
     
-    # Create order
-    order = Order(**order_in.model_dump(), buyer_id=current_user.id)
+    # Create order at the crop's current price, reserving its quantity
+    if not order_in.quantity > 0:
+        raise stock.invalid_quantity()
+    order = Order(
+        **order_in.model_dump(exclude={"buyer_id"}),
+        buyer_id=current_user.id,
+        unit_price=crop.price,
+        total_price=order_total(crop.price, order_in.quantity),
+    )
+    await stock.place(db, order)
     db.add(order)
-    db.commit()
-    db.refresh(order)
-    return order
+    await user_stats.order_placed(db, order, crop.farmer_id)
+    await db.commit()
+    await invalidate_crops(order.crop_id)
+    return await loaders.reload(db, order, loaders.ORDER_DETAIL)
+
+@router.post("/checkout", response_model=List[OrderSchema])
+async def checkout(
+    *,
+    db: AsyncSession = Depends(get_db),
+    cart: CartCheckout,
+    current_user: User = Depends(get_current_buyer_user),
+) -> Any:
+    """
+    Place one pending order per cart item, all or nothing. The cart's crops are
+    locked and read with one query, and every order is inserted with one
+    statement in a single transaction. Totals come from the crops' prices; an
+    item's total_price, when sent, must still match. Problems are reported per
+    item with `loc` pointing at the offending cart entry.
+    """
+    crop_ids = {item.crop_id for item in cart.items}
+    crops = {
+        crop.id: crop for crop in await db.scalars(
+            select(Crop).filter(Crop.id.in_(crop_ids)).order_by(Crop.id).with_for_update()
+        )
+    }
+
+    errors = []
+    for i, item in enumerate(cart.items):
+        crop = crops.get(item.crop_id)
+        if crop is None:
+            errors.append({"loc": ["items", i, "crop_id"], "msg": "Crop not found"})
+        elif not crop.published_to_marketplace:
+            errors.append({"loc": ["items", i, "crop_id"], "msg": "Crop is not available in marketplace"})
+        elif item.total_price is not None and item.total_price != order_total(crop.price, item.quantity):
+            errors.append({"loc": ["items", i, "total_price"], "msg": f"Price has changed to {crop.price} per {crop.unit}"})
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=errors)
+
+    orders = [
+        Order(
+            crop_id=item.crop_id,
+            quantity=item.quantity,
+            status="pending",
+            buyer_id=current_user.id,
+            unit_price=crops[item.crop_id].price,
+            total_price=order_total(crops[item.crop_id].price, item.quantity),
+        )
+        for item in cart.items
+    ]
+    short = await stock.place_all(db, orders)
+    if short:
+        await db.rollback()
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=[
+            {"loc": ["items", i, "quantity"], "msg": "Not enough quantity available"}
+            for i, item in enumerate(cart.items) if item.crop_id in short
+        ])
+
+    # One multi-row INSERT, see import_crops for why SQLite skips RETURNING order
+    postgres = db.bind.dialect.name == "postgresql"
+    ids = (await db.scalars(
+        insert(Order).returning(Order.id, sort_by_parameter_order=postgres),
+        [{column: getattr(order, column) for column in ORDER_COLUMNS} for order in orders],
+    )).all()
+    if not postgres:
+        ids = sorted(ids)
+    await user_stats.orders_placed(db, ((order, crops[order.crop_id].farmer_id) for order in orders))
+    await db.commit()
+    await invalidate_crops(*crop_ids)
+
+    placed = {
+        order.id: order for order in await db.scalars(
+            select(Order)
+            .options(*loaders.ORDER_LIST)
+            .filter(Order.id.in_(ids))
+            # The locked crops are still in the session with their pre-checkout reservations
+            .execution_options(populate_existing=True)
+        )
+    }
+    return json_rows(order_list, [placed[order_id] for order_id in ids])
 
 @router.put("/{order_id}", response_model=OrderSchema)
 async def update_order(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     order_id: int,
     order_in: OrderUpdate,
     current_user: User = Depends(get_current_active_user),
@@ -72,7 +172,7 @@ async def update_order(
     """
     Update an order. Only farmers can update orders for their crops.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(select(Order).options(joinedload(Order.crop)).filter(Order.id == order_id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -93,36 +193,29 @@ async def update_order(
                 detail="Not enough permissions"
             )
     
-    # Update order status
-    order.status = order_in.status
-    
-    # If order is accepted, update crop quantity
-    if order_in.status == "accepted":
-        crop = order.crop
-        if crop.quantity < order.quantity:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Not enough quantity available"
-            )
-        crop.quantity -= order.quantity
-        db.add(crop)
+    # Update order status, converting or returning its stock
+    old_status, old_holding = await stock.change_status(db, order, order_in.status)
+    stock_changed = await stock.transition(db, order, old_holding)
     
     db.add(order)
-    db.commit()
-    db.refresh(order)
-    return order
+    await user_stats.order_status_changed(db, order, order.crop.farmer_id, old_status)
+    await db.commit()
+    if stock_changed:
+        await invalidate_crops(order.crop_id, listed=order.crop.published_to_marketplace)
+    return await loaders.reload(db, order, loaders.ORDER_DETAIL)
 
 @router.get("/{order_id}", response_model=OrderSchema)
 async def read_order(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     order_id: int,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(ORDERS)),
 ) -> Any:
     """
     Get order by ID. Users can only see their own orders.
     """
-    order = db.query(Order).filter(Order.id == order_id).first()
+    order = await db.scalar(select(Order).options(*loaders.ORDER_DETAIL).filter(Order.id == order_id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -142,4 +235,6 @@ async def read_order(
                 detail="Not enough permissions"
             )
     
+    if projection is not None:
+        return await projection.item(db, order)
     return order 
\ No newline at end of file
@@ -1,8 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_current_active_user, get_current_buyer_user
+from app.core.deps import get_db, get_read_db, get_current_active_user, get_current_buyer_user
+from app.core.pagination import paginate, set_next_cursor
+from app.core.serialization import json_rows, review_list
+from app.db import loaders, user_stats
+from app.db.projection import REVIEWS, Projection, projection_params
 from app.models.models import Review, Order, User
 from app.schemas.schemas import Review as ReviewSchema, ReviewCreate, ReviewUpdate
 
@@ -10,26 +15,38 @@ router = APIRouter()
 
 @router.get("/", response_model=List[ReviewSchema])
 async def read_reviews(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(REVIEWS)),
 ) -> Any:
     """
     Retrieve reviews. Users can only see reviews related to their orders.
+    With `fields` or `expand`, rows are flat and related objects are
+    side-loaded (see app.db.projection).
     """
     if current_user.role == "admin":
-        reviews = db.query(Review).offset(skip).limit(limit).all()
+        query = select(Review)
     elif current_user.role == "farmer":
-        reviews = db.query(Review).filter(Review.farmer_id == current_user.id).offset(skip).limit(limit).all()
+        query = select(Review).filter(Review.farmer_id == current_user.id)
     else:  # buyer
-        reviews = db.query(Review).filter(Review.buyer_id == current_user.id).offset(skip).limit(limit).all()
-    return reviews
+        query = select(Review).filter(Review.buyer_id == current_user.id)
+    if projection is not None:
+        rows = (await db.execute(paginate(projection.select(query), Review, skip, limit, cursor))).all()
+        set_next_cursor(response, rows, limit, cursor)
+        return await projection.page(db, rows, response)
+    query = query.options(*loaders.REVIEW_LIST)
+    reviews = (await db.scalars(paginate(query, Review, skip, limit, cursor))).all()
+    set_next_cursor(response, reviews, limit, cursor)
+    return json_rows(review_list, reviews, response)
 
 @router.post("/", response_model=ReviewSchema)
 async def create_review(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     review_in: ReviewCreate,
     current_user: User = Depends(get_current_buyer_user),
 ) -> Any:
@@ -37,7 +54,7 @@ async def create_review(
     Create new review. Only buyers can create reviews.
     """
     # Check if order exists and belongs to the buyer
-    order = db.query(Order).filter(Order.id == review_in.order_id).first()
+    order = await db.scalar(select(Order).filter(Order.id == review_in.order_id))
     if not order:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,7 +72,7 @@ async def create_review(
         )
     
     # Check if review already exists
-    existing_review = db.query(Review).filter(Review.order_id == review_in.order_id).first()
+    existing_review = await db.scalar(select(Review).filter(Review.order_id == review_in.order_id))
     if existing_review:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -63,16 +80,16 @@ async def create_review(
         )
     
     # Create review
-    review = Review(**review_in.model_dump(), buyer_id=current_user.id)
+    review = Review(**review_in.model_dump(exclude={"buyer_id"}), buyer_id=current_user.id)
     db.add(review)
-    db.commit()
-    db.refresh(review)
-    return review
+    await user_stats.review_rated(db, review, review.rating, new=True)
+    await db.commit()
+    return await loaders.reload(db, review, loaders.REVIEW_DETAIL)
 
 @router.put("/{review_id}", response_model=ReviewSchema)
 async def update_review(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     review_id: int,
     review_in: ReviewUpdate,
     current_user: User = Depends(get_current_buyer_user),
@@ -80,7 +97,7 @@ async def update_review(
     """
     Update a review. Only the buyer who created it can update it.
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).filter(Review.id == review_id))
     if not review:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -92,25 +109,27 @@ async def update_review(
             detail="Not enough permissions"
         )
     
+    old_rating = review.rating
     for field, value in review_in.model_dump(exclude_unset=True).items():
         setattr(review, field, value)
     
     db.add(review)
-    db.commit()
-    db.refresh(review)
-    return review
+    await user_stats.review_rated(db, review, review.rating - old_rating)
+    await db.commit()
+    return await loaders.reload(db, review, loaders.REVIEW_DETAIL)
 
 @router.get("/{review_id}", response_model=ReviewSchema)
 async def read_review(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     review_id: int,
     current_user: User = Depends(get_current_active_user),
+    projection: Optional[Projection] = Depends(projection_params(REVIEWS)),
 ) -> Any:
     """
     Get review by ID. Users can only see reviews related to their orders.
     """
-    review = db.query(Review).filter(Review.id == review_id).first()
+    review = await db.scalar(select(Review).options(*loaders.REVIEW_DETAIL).filter(Review.id == review_id))
     if not review:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -130,4 +149,6 @@ async def read_review(
                 detail="Not enough permissions"
             )
     
+    if projection is not None:
+        return await projection.item(db, review)
     return review 
\ No newline at end of file
@@ -1,9 +1,13 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.deps import get_db, get_current_active_user, get_current_admin_user
-from app.core.security import get_password_hash
+from app.core.deps import get_db, get_read_db, get_current_active_user, get_current_admin_user, invalidate_principal
+from app.core.response_cache import invalidate_farmer_profiles
+from app.core.pagination import paginate, set_next_cursor
+from app.core.security import get_password_hash_async
+from app.core.serialization import json_rows, user_list
 from app.models.models import User
 from app.schemas.schemas import User as UserSchema, UserCreate, UserUpdate
 
@@ -20,28 +24,31 @@ async def read_users_me(
 
 @router.get("/", response_model=List[UserSchema])
 async def read_users(
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_admin_user),
 ) -> Any:
     """
     Retrieve users. Only admin can access this endpoint.
     """
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    users = (await db.scalars(paginate(select(User), User, skip, limit, cursor))).all()
+    set_next_cursor(response, users, limit, cursor)
+    return json_rows(user_list, users, response)
 
 @router.post("/", response_model=UserSchema)
 async def create_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserCreate,
     current_user: User = Depends(get_current_admin_user),
 ) -> Any:
     """
     Create new user. Only admin can create new users.
     """
-    user = db.query(User).filter(User.email == user_in.email).first()
+    user = await db.scalar(select(User).filter(User.email == user_in.email))
     if user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -50,27 +57,29 @@ async def create_user(
     user = User(
         email=user_in.email,
         name=user_in.name,
-        password=get_password_hash(user_in.password),
+        password=await get_password_hash_async(user_in.password),
         role=user_in.role,
         phone_number=user_in.phone_number,
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
+    await invalidate_principal(user.email)
     return user
 
 @router.put("/me", response_model=UserSchema)
 async def update_user_me(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     user_in: UserUpdate,
     current_user: User = Depends(get_current_active_user),
 ) -> Any:
     """
     Update own user.
     """
+    old_email = current_user.email
     if user_in.password is not None:
-        current_user.password = get_password_hash(user_in.password)
+        current_user.password = await get_password_hash_async(user_in.password)
     if user_in.email is not None:
         current_user.email = user_in.email
     if user_in.name is not None:
@@ -78,21 +87,25 @@ async def update_user_me(
     if user_in.phone_number is not None:
         current_user.phone_number = user_in.phone_number
     db.add(current_user)
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await invalidate_principal(old_email, current_user.email)
+    if current_user.role == "farmer":
+        # Crop responses embed the farmer's profile
+        await invalidate_farmer_profiles()
     return current_user
 
 @router.get("/{user_id}", response_model=UserSchema)
 async def read_user_by_id(
     user_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
 ) -> Any:
     """
     Get a specific user by id.
     """
-    user = db.query(User).filter(User.id == user_id).first()
-    if user == current_user:
+    user = await db.scalar(select(User).filter(User.id == user_id))
+    if user is not None and user.id == current_user.id:
         return user
     if not user:
         raise HTTPException(
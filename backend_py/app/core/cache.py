@@ -0,0 +1,112 @@
+"""
+Small async key/value caches with a TTL.
+
+MemoryCache is an in-process LRU; RedisCache shares entries between workers
+and is used for every cache when settings.CACHE_URL is set (requires the
+optional `redis` package). Values must be JSON-serializable for RedisCache.
+Each cache counts hits and misses; all caches are registered in `caches`.
+"""
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class MemoryCache:
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+class RedisCache:
+    def __init__(self, namespace: str, ttl: float, url: str):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL is set but the 'redis' package is not installed")
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._redis = redis.from_url(url)
+
+    def _key(self, key: str) -> str:
+        return f"farmsync:{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self._redis.get(self._key(key))
+        except Exception:
+            # A shared cache outage degrades to cache misses, never to errors
+            logger.warning("cache %s: get failed", self.namespace, exc_info=True)
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any) -> None:
+        try:
+            await self._redis.set(self._key(key), json.dumps(value, default=str), ex=max(1, int(self.ttl)))
+        except Exception:
+            logger.warning("cache %s: set failed", self.namespace, exc_info=True)
+
+    async def delete(self, *keys: str) -> None:
+        if not keys:
+            return
+        try:
+            await self._redis.delete(*(self._key(key) for key in keys))
+        except Exception:
+            # Stale entries then live out their TTL
+            logger.warning("cache %s: delete failed", self.namespace, exc_info=True)
+
+    async def clear(self) -> None:
+        async for key in self._redis.scan_iter(match=self._key("*")):
+            await self._redis.delete(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+caches: Dict[str, Any] = {}
+
+def make_cache(namespace: str, ttl: float, maxsize: int):
+    if settings.CACHE_URL:
+        cache = RedisCache(namespace, ttl, settings.CACHE_URL)
+    else:
+        cache = MemoryCache(namespace, ttl, maxsize)
+    caches[namespace] = cache
+    return cache
@@ -12,16 +12,70 @@ class Settings(BaseSettings):
     
     # Database settings
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+    # Schema is managed by `alembic upgrade head`; "create" runs create_all() at
+    # startup instead (throwaway local SQLite databases only)
+    DB_SCHEMA_ON_STARTUP: str = "none"
+    # Comma-separated read replica URLs for read-only requests, see app.db.replicas
+    DATABASE_REPLICA_URLS: Optional[str] = None
+    REPLICA_RETRY_SECONDS: float = 30  # how long a failed replica is skipped
+    REPLICA_READ_YOUR_WRITES_SECONDS: float = 5  # a user's reads stay on the primary after a write
+    # PostgreSQL connection pool per worker, see app.db.pool. DB_POOL="external"
+    # opens a connection per session to a transaction-mode pooler instead.
+    DB_POOL: str = "queue"
+    DB_POOL_SIZE: int = 5
+    DB_POOL_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 5  # beyond this wait for a connection, requests get 503
+    DB_POOL_RETRY_AFTER_SECONDS: int = 1
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: str = "idle"  # "always", "idle" or "never"
+    DB_POOL_PING_IDLE_SECONDS: float = 60
+    # Background database probe behind GET /readyz, see app.core.health
+    HEALTH_PROBE_INTERVAL_SECONDS: float = 10
+    HEALTH_PROBE_TIMEOUT_SECONDS: float = 3
+    # Log every statement with its parameters (local debugging only)
+    SQL_ECHO: bool = False
+    # Structured query log, see app.db.query_log: "off", "sampled" (a random
+    # QUERY_LOG_SAMPLE_RATE of statements) or "slow" (over QUERY_LOG_SLOW_MS)
+    QUERY_LOG: str = "off"
+    QUERY_LOG_SAMPLE_RATE: float = 0.01
+    QUERY_LOG_SLOW_MS: float = 200
+    # Per-route request and database metrics on GET /metrics, see app.core.metrics
+    METRICS_ENABLED: bool = True
     
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Password hashing: bcrypt cost, and the worker pool that keeps it off the event loop
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64  # beyond this, logins are shed with 503
+    
+    # Stock reservations: how long a pending order holds its quantity, and how
+    # often expired reservations are released
+    ORDER_RESERVATION_MINUTES: int = 30
+    RESERVATION_SWEEP_SECONDS: int = 60
+    
     # File Upload Settings
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 5 * 1024 * 1024  # 5MB
     
+    # Bulk crop import: rows per request, and rows per multi-row INSERT/UPDATE
+    CROP_IMPORT_MAX_ROWS: int = 10000
+    CROP_IMPORT_CHUNK_SIZE: int = 500
+    
+    # Encode responses with orjson (when installed) instead of the stdlib json
+    FAST_JSON_RESPONSES: bool = False
+    
+    # Cache Settings
+    CACHE_URL: Optional[str] = None  # e.g. redis://localhost:6379/0, in-process when unset
+    AUTH_CACHE_TTL_SECONDS: int = 60
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
+    # Cached GET /crops/ pages and crop details, see app.core.response_cache
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    RESPONSE_CACHE_MAX_ENTRIES: int = 2000
+    
     class Config:
         case_sensitive = True
 
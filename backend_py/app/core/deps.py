@@ -1,27 +1,117 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from datetime import datetime
+from typing import Any, AsyncGenerator, Dict, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
+from fastapi.security.utils import get_authorization_scheme_param
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy import exc, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import make_cache
 from app.core.config import settings
 from app.core.security import verify_token
-from app.db.session import SessionLocal
+from app.db.replicas import is_connect_error, is_disconnect
+from app.db.session import SessionLocal, engine, read_session, replicas
 from app.models.models import User
 from app.schemas.schemas import TokenData
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_db() -> Generator:
-    try:
-        db = SessionLocal()
+# Resolved principals keyed on the token subject (email), so authenticated
+# requests don't each pay a users lookup. Entries hold the user's column values,
+# except the password hash, which must not land in a shared cache; the cached
+# user leaves it unloaded, and password checks load the user from the database.
+principal_cache = make_cache(
+    "principal",
+    ttl=settings.AUTH_CACHE_TTL_SECONDS,
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+)
+
+UNCACHED_COLUMNS = ("password",)
+
+def _principal(user: User) -> Dict[str, Any]:
+    return {
+        column.key: getattr(user, column.key)
+        for column in User.__table__.columns
+        if column.key not in UNCACHED_COLUMNS
+    }
+
+async def _attach_principal(db: AsyncSession, values: Dict[str, Any]) -> User:
+    # Rebuild the user as if loaded from the database and attach it to this
+    # session without a query, so handlers can still modify and commit it.
+    for key in ("created_at", "updated_at"):
+        if isinstance(values.get(key), str):
+            values = {**values, key: datetime.fromisoformat(values[key])}
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+async def invalidate_principal(*emails: Optional[str]) -> None:
+    await principal_cache.delete(*(email for email in emails if email))
+
+# Token subjects (emails) that recently sent a write: their reads stay on the
+# primary until the replicas have caught up with it
+recent_writers = make_cache(
+    "recent-writers",
+    ttl=settings.REPLICA_READ_YOUR_WRITES_SECONDS,
+    maxsize=settings.AUTH_CACHE_MAX_ENTRIES,
+)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def _token_subject(request: Request) -> Optional[str]:
+    scheme, token = get_authorization_scheme_param(request.headers.get("Authorization"))
+    return verify_token(token) if scheme.lower() == "bearer" and token else None
+
+async def get_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """A session on the primary, for routes that write (and principal lookups)."""
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
+    if replicas and request.method not in SAFE_METHODS:
+        subject = _token_subject(request)
+        if subject is not None:
+            await recent_writers.set(subject, True)
 
+async def get_read_db(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    """
+    A session for read-only routes: on a read replica when any is configured
+    and healthy, on the primary for users who wrote in the last
+    REPLICA_READ_YOUR_WRITES_SECONDS. When the replica can't be connected to
+    the request is served from the primary; the replica is taken out of
+    rotation if it is down, not if its pool is exhausted (see app.db.replicas).
+    """
+    primary = False
+    if replicas:
+        subject = _token_subject(request)
+        primary = subject is not None and await recent_writers.get(subject) is not None
+    db = read_session(primary)
+    if db.bind is not engine:
+        # Connect before handing the session out, while the request can still
+        # move to the primary
+        try:
+            await db.connection()
+        except Exception as e:
+            await db.close()
+            if is_connect_error(e):
+                replicas.failed(db.bind, e)
+            elif not isinstance(e, exc.TimeoutError):
+                raise
+            db = SessionLocal()
+    async with db:
+        try:
+            yield db
+        except Exception as e:
+            if db.bind is not engine and is_disconnect(e):
+                replicas.failed(db.bind, e)
+            raise
+
+# Principals are loaded from the primary, also on read-only routes, so new
+# users and role changes apply at once; principal_cache absorbs nearly all of
+# these lookups, and the session doesn't connect on a cache hit.
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
 ) -> User:
     credentials_exception = HTTPException(
@@ -40,9 +130,14 @@ async def get_current_user(
     except (jwt.JWTError, ValidationError):
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == token_data.email).first()
+    cached = await principal_cache.get(token_data.email)
+    if cached is not None:
+        return await _attach_principal(db, cached)
+    
+    user = await db.scalar(select(User).filter(User.email == token_data.email))
     if user is None:
         raise credentials_exception
+    await principal_cache.set(token_data.email, _principal(user))
     return user
 
 def get_current_active_user(
@@ -0,0 +1,111 @@
+"""
+Liveness and readiness.
+
+GET /livez answers as long as the event loop does, without any I/O: a slow
+database must not get healthy workers restarted. GET /readyz reports whether
+this worker can serve traffic, from state that is already in memory: the
+result of the last database probe, which runs in the background every
+HEALTH_PROBE_INTERVAL_SECONDS on its own connection checkout, the pool's
+usage, and whether the upload directory is writable. Probes hitting /readyz
+therefore never take a pool connection, however often they come.
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core import metrics
+from app.core.config import settings
+from app.core.uploads import UPLOAD_ROOT
+from app.db.replicas import ReplicaSet
+
+logger = logging.getLogger(__name__)
+
+class DatabaseProbe:
+    def __init__(self, engine: AsyncEngine, interval: float, timeout: float):
+        self.engine = engine
+        self.interval = interval
+        self.timeout = timeout
+        self.ok: Optional[bool] = None  # None until the first probe finishes
+        self.latency_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.checked_at: Optional[float] = None  # time.monotonic()
+        self.checked_at_wall: Optional[datetime] = None
+
+    async def _select_one(self) -> None:
+        async with self.engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    async def check(self) -> bool:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._select_one(), self.timeout)
+        except Exception as e:
+            if self.ok is not False:
+                logger.warning("Database probe failed: %r", e)
+            self.ok, self.error = False, repr(e)
+        else:
+            if self.ok is False:
+                logger.info("Database probe recovered")
+            self.ok, self.error = True, None
+        self.latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        self.checked_at = time.monotonic()
+        self.checked_at_wall = datetime.now(timezone.utc)
+        return self.ok
+
+    async def run_forever(self) -> None:
+        while True:
+            await self.check()
+            await asyncio.sleep(self.interval)
+
+    @property
+    def stale(self) -> bool:
+        """The probe loop stopped reporting (e.g. stuck behind a dead connection)."""
+        return self.checked_at is None or time.monotonic() - self.checked_at > 3 * self.interval + self.timeout
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ok": bool(self.ok) and not self.stale,
+            "latency_ms": self.latency_ms,
+            "checked_at": self.checked_at_wall.isoformat() if self.checked_at_wall else None,
+            "error": self.error if self.checked_at is not None else "not probed yet",
+        }
+
+def pool_status(engine: AsyncEngine) -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"class": type(pool).__name__}
+    if hasattr(pool, "size"):
+        limit = pool.size() + settings.DB_POOL_MAX_OVERFLOW
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+            limit=limit,
+            saturated=pool.checkedout() >= limit,
+        )
+    status["timeouts"] = metrics.pool_timeouts
+    return status
+
+def uploads_status() -> Dict[str, Any]:
+    return {
+        "path": str(UPLOAD_ROOT),
+        "ok": UPLOAD_ROOT.is_dir() and os.access(UPLOAD_ROOT, os.W_OK | os.X_OK),
+    }
+
+def readiness(probe: DatabaseProbe, replicas: Optional[ReplicaSet] = None) -> Dict[str, Any]:
+    database, uploads = probe.status(), uploads_status()
+    report = {
+        "status": "ready" if database["ok"] and uploads["ok"] else "unavailable",
+        "database": database,
+        "pool": pool_status(probe.engine),
+        "uploads": uploads,
+    }
+    if replicas:
+        # Informational: reads fall back to the primary without them
+        report["replicas"] = replicas.status()
+    return report
@@ -0,0 +1,218 @@
+"""
+In-process request and database metrics, served by GET /metrics in the
+Prometheus text format:
+
+    http_request_duration_seconds{route}      histogram of request latency
+    http_responses_total{route,status}        responses by status code
+    http_requests_in_flight                   requests being served now
+    db_queries_per_request{route}             histogram of statements per request
+    db_query_seconds_total{route}             time spent in statements
+    db_connections_checked_out{route}         pool connections held right now
+    db_pool_checkout_wait_seconds             histogram of waits for a pooled connection
+    db_pool_timeouts_total                    checkouts that gave up (503 responses)
+    db_pool_*                                 pool size, checked out and overflow
+    cache_*_total{cache}                      hits and misses of app.core.cache caches
+    password_hash_shed_total                  logins shed with 503 by PasswordHasher
+
+`route` is the request's route name from app.core.request_context (e.g.
+GET /api/v1/crops/{crop_id}), the same as in the query log, so label values
+stay bounded. Recording is a few dict lookups per request and two
+clock reads per statement; everything else happens when /metrics is scraped.
+Counters are per worker process, like the caches.
+"""
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.request_context import current_route, route_name
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+# Database work outside requests (reservation sweeper, pool warm-up)
+BACKGROUND = "background"
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float], label: Optional[str] = None):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.label = label
+        # label value -> [count per bucket..., +Inf], sum
+        self.series: Dict[Optional[str], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, label: Optional[str] = None) -> None:
+        series = self.series.get(label)
+        if series is None:
+            series = self.series[label] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label, (counts, total) in sorted(self.series.items(), key=lambda item: item[0] or ""):
+            labels = f'{self.label}="{_escape(label)}",' if self.label else ""
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                yield f'{self.name}_bucket{{{labels}le="{bound}"}} {cumulative}'
+            yield f"{self.name}_sum{_labels(self.label, label)} {total[0]}"
+            yield f"{self.name}_count{_labels(self.label, label)} {cumulative}"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(*pairs: Optional[str]) -> str:
+    """`{name="value",...}` from alternating names and values, skipping unnamed ones."""
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(pairs[::2], pairs[1::2]) if name]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _metric(name: str, kind: str, help: str, samples: Dict[Tuple, float], *label_names: str) -> Iterator[str]:
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} {kind}"
+    for values, value in sorted(samples.items()):
+        pairs = [part for pair in zip(label_names, values) for part in pair]
+        yield f"{name}{_labels(*pairs)} {value}"
+
+request_duration = Histogram("http_request_duration_seconds", "Request latency by route.", LATENCY_BUCKETS, "route")
+request_queries = Histogram("db_queries_per_request", "SQL statements run per request.", QUERY_COUNT_BUCKETS, "route")
+checkout_wait = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection.", WAIT_BUCKETS)
+responses: Dict[Tuple[str, int], int] = defaultdict(int)
+query_seconds: Dict[str, float] = defaultdict(float)
+connections: Dict[str, int] = defaultdict(int)
+in_flight = 0
+pool_timeouts = 0
+
+class _QueryCount:
+    __slots__ = ("queries",)
+
+    def __init__(self):
+        self.queries = 0
+
+# Statements run by the request this task serves; its route comes from app.core.request_context
+_request_queries: ContextVar[Optional[_QueryCount]] = ContextVar("request_queries", default=None)
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = _QueryCount()
+        token = _request_queries.set(stats)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight -= 1
+            _request_queries.reset(token)
+            route = route_name(scope)
+            request_duration.observe(elapsed, route)
+            request_queries.observe(stats.queries, route)
+            responses[route, status_code] += 1
+
+def instrument_engine(engine: Engine) -> None:
+    """Count statements, their time and connections held per route on a (sync) engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context._metrics_start
+        stats = _request_queries.get()
+        if stats is not None:
+            stats.queries += 1
+        query_seconds[current_route() or BACKGROUND] += elapsed
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        route = current_route() or BACKGROUND
+        connection_record.info["metrics_route"] = route
+        connections[route] += 1
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        route = connection_record.info.pop("metrics_route", None)
+        if route is not None:
+            connections[route] -= 1
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool recording how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        global pool_timeouts
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts += 1
+            raise
+        finally:
+            checkout_wait.observe(time.perf_counter() - started)
+
+def render(engine: Engine) -> str:
+    from app.core.cache import caches
+    from app.core.security import password_hasher
+
+    lines: List[str] = []
+    lines.extend(request_duration.render())
+    lines.extend(_metric(
+        "http_responses_total", "counter", "Responses by route and status code.",
+        dict(responses), "route", "status",
+    ))
+    lines.extend(_metric("http_requests_in_flight", "gauge", "Requests being served.", {(): in_flight}))
+    lines.extend(request_queries.render())
+    lines.extend(_metric(
+        "db_query_seconds_total", "counter", "Time spent in SQL statements by route.",
+        {(route,): seconds for route, seconds in query_seconds.items()}, "route",
+    ))
+    lines.extend(_metric(
+        "db_connections_checked_out", "gauge", "Pool connections held, by the route holding them.",
+        {(route,): count for route, count in connections.items()}, "route",
+    ))
+    lines.extend(checkout_wait.render())
+    lines.extend(_metric(
+        "db_pool_timeouts_total", "counter", "Checkouts that timed out waiting for a connection.", {(): pool_timeouts},
+    ))
+    pool = engine.pool
+    for name, help in (("size", "Configured pool size."), ("checkedout", "Connections checked out."), ("overflow", "Connections beyond the pool size.")):
+        if hasattr(pool, name):
+            lines.extend(_metric(f"db_pool_{name}", "gauge", help, {(): getattr(pool, name)()}))
+    cache_stats = {namespace: cache.stats() for namespace, cache in caches.items()}
+    for stat, kind in (("hits", "counter"), ("misses", "counter"), ("size", "gauge")):
+        name = f"cache_{stat}_total" if kind == "counter" else f"cache_{stat}"
+        samples = {(namespace,): values[stat] for namespace, values in cache_stats.items() if stat in values}
+        if samples:
+            lines.extend(_metric(name, kind, f"Cache {stat}.", samples, "cache"))
+    lines.extend(_metric(
+        "password_hash_shed_total", "counter", "Password checks shed with 503.", {(): password_hasher.shed},
+    ))
+    lines.extend(_metric(
+        "password_hash_pending", "gauge", "Password checks queued or running.", {(): password_hasher.pending},
+    ))
+    return "\n".join(lines) + "\n"
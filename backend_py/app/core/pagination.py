@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import Select, tuple_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(created_at: datetime, id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(id)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def paginate(query: Select, model, skip: int, limit: int, cursor: Optional[str]) -> Select:
+    """
+    Apply offset pagination, or keyset pagination when a cursor is given.
+
+    Cursor mode is opt-in: pass an empty `cursor` for the first page and the
+    value of the X-Next-Cursor response header for the following ones. Rows
+    come newest first on (created_at, id), so every page is a single index
+    range scan instead of skipping over all earlier rows.
+    """
+    if cursor is None:
+        return query.offset(skip).limit(limit)
+    query = query.order_by(model.created_at.desc(), model.id.desc())
+    if cursor:
+        query = query.filter(tuple_(model.created_at, model.id) < decode_cursor(cursor))
+    return query.limit(limit)
+
+def set_next_cursor(response: Response, rows: Sequence, limit: int, cursor: Optional[str]) -> None:
+    """
+    Point the client at the next page, if any, in cursor mode.
+    """
+    if cursor is not None and rows and len(rows) == limit:
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
@@ -0,0 +1,51 @@
+"""
+The request being served by the current task, for code far from the handler
+(e.g. SQLAlchemy event listeners) that wants to attribute work to a route.
+"""
+from contextvars import ContextVar
+from typing import Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+_scope: ContextVar[Optional[Scope]] = ContextVar("request_scope", default=None)
+
+# Requests no route or mount matched (404s)
+UNMATCHED = "unmatched"
+METHODS = ("GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS")
+
+def route_name(scope: Scope) -> str:
+    """
+    `METHOD /path/{template}` once routing has matched, `METHOD /mount` for
+    mounted apps (/uploads), else "unmatched". Never the raw path, and unknown
+    methods read OTHER, so names are bounded and usable as metric labels.
+    """
+    method = scope.get("method", scope["type"].upper())
+    if method not in METHODS:
+        method = "OTHER"
+    route = scope.get("route")
+    if route is not None:
+        return f"{method} {route.path}"
+    if "endpoint" in scope and scope.get("root_path"):
+        # Mounted apps have an endpoint but no route
+        return f"{method} {scope['root_path']}"
+    return UNMATCHED
+
+def current_route() -> Optional[str]:
+    """The route of the request this task serves; None outside requests (background tasks, CLIs)."""
+    scope = _scope.get()
+    return route_name(scope) if scope is not None else None
+
+class RequestContextMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        # The router adds the matched route to this same scope dict later on
+        token = _scope.set(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _scope.reset(token)
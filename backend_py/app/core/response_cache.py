@@ -0,0 +1,102 @@
+"""
+Cached JSON responses with ETags for the hot marketplace reads.
+
+Entries live in a cache from app.core.cache (in-process LRU, shared between
+workers when settings.CACHE_URL is set; with several workers and no CACHE_URL
+other workers only see a change once their entries expire). An entry's key
+holds the current generation of every scope its response depends on, e.g.
+one crop or the published crop list. Writers call invalidate() after
+committing, which starts new generations: entries built from the old data
+become unreachable at once, including ones a concurrent request is still
+computing, and age out of the LRU.
+
+The ETag is a hash of the body, so clients revalidating with If-None-Match
+get a 304 straight from the cache, and still after an invalidation when the
+rebuilt body turns out identical.
+"""
+import hashlib
+import secrets
+from typing import Dict, Optional, Sequence
+
+from fastapi import Request, Response, status
+
+from app.core.cache import make_cache
+from app.core.config import settings
+
+# Authenticated responses: browsers may keep them but must revalidate each time
+CACHE_CONTROL = "private, no-cache"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+class ResponseCache:
+    def __init__(self, namespace: str, ttl: float, maxsize: int):
+        self.cache = make_cache(namespace, ttl=ttl, maxsize=maxsize)
+        self.generations = make_cache(f"{namespace}-generations", ttl=ttl, maxsize=maxsize)
+
+    async def _generation(self, scope: str) -> str:
+        generation = await self.generations.get(scope)
+        if generation is None:
+            # Unknown or evicted: entries from an earlier generation can't be trusted
+            generation = secrets.token_hex(8)
+            await self.generations.set(scope, generation)
+        return generation
+
+    async def key(self, scopes: Sequence[str], *params) -> str:
+        """The key of a response depending on `scopes`, for the route parameters `params`."""
+        generations = [await self._generation(scope) for scope in scopes]
+        return ":".join(str(part) for part in (*generations, *params))
+
+    async def get(self, request: Request, key: str) -> Optional[Response]:
+        entry = await self.cache.get(key)
+        return self._response(request, entry) if entry is not None else None
+
+    async def set(self, request: Request, key: str, body: bytes, headers: Optional[Dict[str, str]] = None) -> Response:
+        entry = {
+            "etag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+            "body": body.decode(),
+            "headers": headers or {},
+        }
+        await self.cache.set(key, entry)
+        return self._response(request, entry)
+
+    async def invalidate(self, *scopes: str) -> None:
+        for scope in scopes:
+            await self.generations.set(scope, secrets.token_hex(8))
+
+    def _response(self, request: Request, entry: dict) -> Response:
+        headers = {**entry["headers"], "ETag": entry["etag"], "Cache-Control": CACHE_CONTROL}
+        if etag_matches(request.headers.get("if-none-match"), entry["etag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(entry["body"], media_type="application/json", headers=headers)
+
+# GET /crops/ and GET /crops/{crop_id}. Crop responses embed stock levels and
+# the farmer's profile, so stock changes and farmer profile edits invalidate too.
+crop_responses = ResponseCache(
+    "crop-responses",
+    ttl=settings.RESPONSE_CACHE_TTL_SECONDS,
+    maxsize=settings.RESPONSE_CACHE_MAX_ENTRIES,
+)
+
+CROP_LIST = "crop-list"
+FARMERS = "farmers"
+
+def crop_scope(crop_id: int) -> str:
+    return f"crop:{crop_id}"
+
+async def invalidate_crops(*crop_ids: int, listed: bool = True) -> None:
+    """
+    Call after committing changes to these crops; `listed` unless the crops
+    were and still are unpublished, so GET /crops/ pages can't show them.
+    """
+    scopes = [crop_scope(crop_id) for crop_id in crop_ids]
+    if listed:
+        scopes.append(CROP_LIST)
+    await crop_responses.invalidate(*scopes)
+
+async def invalidate_farmer_profiles() -> None:
+    await crop_responses.invalidate(CROP_LIST, FARMERS)
@@ -0,0 +1,64 @@
+"""
+Fast JSON serialization for list endpoints.
+
+For a response_model, FastAPI validates the returned ORM rows into schema
+instances, dumps those to dicts and lists, and encodes the result with the
+stdlib json module. json_rows() validates the rows with a pre-built
+TypeAdapter and lets pydantic-core write the JSON bytes directly. Routes keep
+their response_model, which still documents the response in OpenAPI.
+
+FastJSONResponse is the opt-in (settings.FAST_JSON_RESPONSES) default response
+class for every other route. It encodes with orjson when that package is
+installed, and with pydantic-core otherwise.
+
+    python -m benchmarks.serialization    # per-row cost of each response schema
+"""
+from decimal import Decimal
+from typing import Any, List, Optional
+
+import pydantic_core
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.schemas import (
+    Crop as CropSchema,
+    CropSearchResults,
+    Order as OrderSchema,
+    Review as ReviewSchema,
+    User as UserSchema,
+)
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+        return pydantic_core.to_json(content)
+
+user_list = TypeAdapter(List[UserSchema])
+crop_list = TypeAdapter(List[CropSchema])
+order_list = TypeAdapter(List[OrderSchema])
+review_list = TypeAdapter(List[ReviewSchema])
+crop_search_results = TypeAdapter(CropSearchResults)
+
+def dump_rows(adapter: TypeAdapter, rows: Any) -> bytes:
+    """Validate ORM rows (or dicts holding them) through the adapter's schema and encode them."""
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+def json_rows(adapter: TypeAdapter, rows: Any, response: Optional[Response] = None) -> Response:
+    """
+    A JSON response of `rows` serialized by dump_rows(), keeping the headers
+    the route set on its injected `response` (e.g. X-Next-Cursor).
+    """
+    headers = dict(response.headers) if response is not None else None
+    return Response(dump_rows(adapter, rows), media_type="application/json", headers=headers)
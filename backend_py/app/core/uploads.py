@@ -0,0 +1,340 @@
+"""
+Crop photo storage: a content-addressed store of size-capped uploads, resized
+WebP variants, and the /uploads static app that serves them.
+
+Photos are stored as `{sha256}{ext}`, so identical uploads share one file and a
+URL's content never changes: it can be cached forever and its ETag is the hash.
+Files no longer referenced by any Crop.photo are removed by
+
+    python -m app.core.uploads [--dry-run]
+"""
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import anyio
+from fastapi import HTTPException, UploadFile, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.models import Crop
+
+logger = logging.getLogger(__name__)
+
+# Relative UPLOAD_DIR is resolved against the backend directory, where /uploads is mounted from
+UPLOAD_ROOT = Path(settings.UPLOAD_DIR)
+if not UPLOAD_ROOT.is_absolute():
+    UPLOAD_ROOT = Path(__file__).resolve().parent.parent.parent / UPLOAD_ROOT
+
+CHUNK_SIZE = 1024 * 1024
+# Widths of the WebP variants generated for each photo
+VARIANT_WIDTHS = (320, 800)
+# Allowance for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+# Content-addressed names: the hash, then an extension or a variant suffix
+HASHED_NAME = re.compile(r"^[0-9a-f]{64}(\.w\d+)?(\.[a-z0-9]{1,8})?$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Unreferenced files younger than this are kept: their crop may not be committed yet
+GC_GRACE_SECONDS = 3600
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File exceeds the {settings.MAX_UPLOAD_SIZE} byte upload limit",
+    )
+
+def _atomic_path(path: Path) -> Path:
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+def _suffix(filename: Optional[str]) -> str:
+    suffix = os.path.splitext(filename or "")[1].lower()
+    return suffix if re.fullmatch(r"\.[a-z0-9]{1,8}", suffix) else ""
+
+def _write(buffer, digest, chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+def _publish(tmp_path: Path, path: Path) -> None:
+    if path.exists():
+        # Same content is already stored: keep the existing file, but renew
+        # its mtime (and its variants') so collect_garbage's grace window
+        # covers the crop about to reference it again
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Collected in the meantime
+            os.replace(tmp_path, path)
+            return
+        tmp_path.unlink()
+        for width in VARIANT_WIDTHS:
+            with contextlib.suppress(FileNotFoundError):
+                os.utime(variant_path(path, width))
+    else:
+        os.replace(tmp_path, path)
+
+async def save_upload(file: UploadFile, root: Path = UPLOAD_ROOT, max_size: int = settings.MAX_UPLOAD_SIZE) -> Path:
+    """
+    Copy an upload into the store in chunks, rejecting it with 413 as soon as
+    it grows past `max_size`, and return its content-addressed path. The file
+    is written under a temporary name and renamed into place, so readers never
+    see a partial photo.
+    """
+    if file.size is not None and file.size > max_size:
+        raise too_large()
+
+    root.mkdir(parents=True, exist_ok=True)
+    tmp_path = _atomic_path(root / "upload")
+    digest = hashlib.sha256()
+    size = 0
+    buffer = await run_in_threadpool(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            if size > max_size:
+                raise too_large()
+            await run_in_threadpool(_write, buffer, digest, chunk)
+        await run_in_threadpool(buffer.close)
+        path = root / f"{digest.hexdigest()}{_suffix(file.filename)}"
+        await run_in_threadpool(_publish, tmp_path, path)
+    except BaseException:
+        buffer.close()
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return path
+
+def variant_path(path: Path, width: int) -> Path:
+    return path.with_name(f"{path.stem}.w{width}.webp")
+
+def variant_urls(photo_url: str) -> Dict[str, str]:
+    """
+    URLs of the resized variants of a photo, e.g. /uploads/crop_1.w320.webp.
+    Variants are generated in the background, so they may briefly 404 after upload.
+    """
+    base = photo_url.rsplit(".", 1)[0] if "." in photo_url.rsplit("/", 1)[-1] else photo_url
+    return {str(width): f"{base}.w{width}.webp" for width in VARIANT_WIDTHS}
+
+def make_variants(path: Path) -> None:
+    """
+    Write downscaled WebP copies of a photo. Runs as a background task, in a
+    worker thread; failures only cost the thumbnails, never the upload.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        logger.warning("Pillow is not installed, skipping photo variants for %s", path.name)
+        return
+
+    try:
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGB")
+            for width in VARIANT_WIDTHS:
+                target = variant_path(path, width)
+                if target.exists():
+                    continue
+                variant = image.copy()
+                variant.thumbnail((width, width * 4))
+                tmp_path = _atomic_path(target)
+                variant.save(tmp_path, "WEBP", quality=80, method=4)
+                os.replace(tmp_path, target)
+    except Exception:
+        logger.exception("Could not create photo variants for %s", path.name)
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized photo uploads before the multipart body is parsed and
+    spooled: by Content-Length up front, and by counting bytes for chunked
+    bodies without one. A malformed Content-Length is a 400.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int = settings.MAX_UPLOAD_SIZE, path_suffix: str = "/photo"):
+        self.app = app
+        self.limit = max_size + MULTIPART_OVERHEAD
+        self.path_suffix = path_suffix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].endswith(self.path_suffix):
+            await self.app(scope, receive, send)
+            return
+
+        content_length: Optional[int] = None
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if not value.strip().isdigit():
+                    await self._reject(send, status.HTTP_400_BAD_REQUEST, "Invalid Content-Length header")
+                    return
+                content_length = int(value)
+        if content_length is not None and content_length > self.limit:
+            await self._reject(
+                send, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                f"File exceeds the {settings.MAX_UPLOAD_SIZE} byte upload limit",
+            )
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            # Surfaces through the body parser as a regular 413 response
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.limit:
+                    raise too_large()
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send: Send, status_code: int, detail: str) -> None:
+        body = json.dumps({"detail": detail}, separators=(",", ":")).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status_code,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+def _parse_range(value: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single `bytes=` range into inclusive (start, end) offsets. Returns
+    None for anything else, in which case the whole file is served; raises
+    ValueError when the range lies outside the file.
+    """
+    match = re.fullmatch(r"bytes=(\d*)-(\d*)", value.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first == "":
+        start, end = max(0, size - int(last)), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(value)
+    return start, end
+
+class FileRangeResponse(FileResponse):
+    """A 206 response carrying bytes `start`..`end` (inclusive) of a file."""
+
+    def __init__(self, path: Path, start: int, end: int, stat_result: os.stat_result, headers: Dict[str, str]):
+        headers = {
+            **headers,
+            "content-range": f"bytes {start}-{end}/{stat_result.st_size}",
+            "content-length": str(end - start + 1),
+        }
+        super().__init__(path, status_code=status.HTTP_206_PARTIAL_CONTENT, headers=headers, stat_result=stat_result)
+        self.start = start
+        self.end = end
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"].upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            remaining = self.end - self.start + 1
+            while True:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                more_body = bool(chunk) and remaining > 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                if not more_body:
+                    break
+
+class UploadFiles(StaticFiles):
+    """
+    StaticFiles for the upload store. Content-addressed files get a strong
+    ETag (their hash) and immutable far-future caching; every file supports
+    conditional GET (If-None-Match / If-Modified-Since) and single byte
+    ranges, honouring If-Range.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        response = FileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if status_code != 200:
+            return response
+
+        name = os.path.basename(full_path)
+        if HASHED_NAME.match(name):
+            response.headers["etag"] = f'"{Path(name).stem}"'
+            response.headers["cache-control"] = IMMUTABLE
+        response.headers["accept-ranges"] = "bytes"
+
+        request_headers = Headers(scope=scope)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+
+        etag = response.headers["etag"]
+        requested = request_headers.get("range")
+        if requested and request_headers.get("if-range", etag) == etag:
+            try:
+                byte_range = _parse_range(requested, stat_result.st_size)
+            except ValueError:
+                return Response(
+                    status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={"content-range": f"bytes */{stat_result.st_size}", "etag": etag},
+                )
+            if byte_range is not None:
+                return FileRangeResponse(full_path, *byte_range, stat_result, dict(response.headers))
+        return response
+
+def _photo_key(name: str) -> str:
+    # crop photo "abc.jpg" and its variants "abc.w320.webp" share the key "abc"
+    return name.split(".", 1)[0]
+
+async def collect_garbage(db: AsyncSession, root: Path = UPLOAD_ROOT, dry_run: bool = False,
+                          grace: float = GC_GRACE_SECONDS) -> List[Path]:
+    """
+    Delete stored photos and variants that no Crop.photo references any more,
+    plus abandoned temporary files. Returns the paths removed (or that would
+    be, with `dry_run`).
+    """
+    photos = await db.scalars(select(Crop.photo).filter(Crop.photo.isnot(None)).distinct())
+    referenced = {_photo_key(photo.rsplit("/", 1)[-1]) for photo in photos}
+    cutoff = time.time() - grace
+
+    removed = []
+    for path in root.iterdir() if root.is_dir() else ():
+        if not path.is_file() or path.stat().st_mtime > cutoff:
+            continue
+        temporary = path.name.startswith(".") and path.name.endswith(".tmp")
+        if temporary or _photo_key(path.name) not in referenced:
+            removed.append(path)
+            if not dry_run:
+                path.unlink(missing_ok=True)
+    return removed
+
+async def main(dry_run: bool, grace: float) -> int:
+    engine.echo = False
+    async with SessionLocal() as db:
+        removed = await collect_garbage(db, dry_run=dry_run, grace=grace)
+    await engine.dispose()
+    for path in removed:
+        print(path.name)
+    print(f"{len(removed)} unreferenced file(s)" + (" found" if dry_run else " removed"))
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Remove uploaded photos no crop references any more.")
+    parser.add_argument("--dry-run", action="store_true", help="only list the files, don't delete them")
+    parser.add_argument("--grace", type=float, default=GC_GRACE_SECONDS, help="keep files younger than this many seconds")
+    args = parser.parse_args()
+    raise SystemExit(asyncio.run(main(args.dry_run, args.grace)))
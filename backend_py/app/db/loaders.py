@@ -0,0 +1,62 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.models.models import Crop, Order, Review
+
+# Loader profiles for the nested response schemas in app.schemas.schemas.
+#
+# *_DETAIL profiles serve single-row reads: every relationship is joined into
+# the one SELECT. *_LIST profiles serve pages of rows: related users and crops
+# are fetched with one "WHERE id IN (...)" query per relationship, so a page
+# costs a fixed number of queries regardless of its size and rows sharing a
+# farmer or buyer don't repeat it in the result set.
+
+CROP_DETAIL = (
+    joinedload(Crop.farmer),
+)
+
+CROP_LIST = (
+    selectinload(Crop.farmer),
+)
+
+ORDER_DETAIL = (
+    joinedload(Order.buyer),
+    joinedload(Order.crop).joinedload(Crop.farmer),
+)
+
+ORDER_LIST = (
+    selectinload(Order.buyer),
+    selectinload(Order.crop).selectinload(Crop.farmer),
+)
+
+REVIEW_DETAIL = (
+    joinedload(Review.buyer),
+    joinedload(Review.farmer),
+    joinedload(Review.order).options(
+        joinedload(Order.buyer),
+        joinedload(Order.crop).joinedload(Crop.farmer),
+    ),
+)
+
+REVIEW_LIST = (
+    selectinload(Review.buyer),
+    selectinload(Review.farmer),
+    selectinload(Review.order).options(
+        selectinload(Order.buyer),
+        selectinload(Order.crop).selectinload(Crop.farmer),
+    ),
+)
+
+async def reload(db: AsyncSession, instance, options):
+    """
+    Re-select a freshly written row with the relationships its response schema embeds.
+    Used instead of db.refresh(), which only reloads column attributes.
+    """
+    model = type(instance)
+    return await db.scalar(
+        select(model)
+        .options(*options)
+        .filter(model.id == instance.id)
+        .execution_options(populate_existing=True)
+    )
@@ -0,0 +1,94 @@
+"""
+Connection pool settings for PostgreSQL, and what happens when it runs dry.
+
+DB_POOL=queue (default) keeps DB_POOL_SIZE connections per worker, plus up to
+DB_POOL_MAX_OVERFLOW more under load. A request that can't get a connection
+within DB_POOL_TIMEOUT_SECONDS fails fast with 503 and Retry-After instead of
+hanging. Connections are checked before use according to DB_POOL_PRE_PING:
+
+    always  a round-trip on every checkout (SQLAlchemy's pool_pre_ping)
+    idle    only when the connection sat in the pool over DB_POOL_PING_IDLE_SECONDS
+    never   rely on DB_POOL_RECYCLE_SECONDS and reconnecting after errors
+
+DB_POOL=external defers pooling to a transaction-mode pooler such as PgBouncer
+or Neon's "-pooler" endpoint: every session opens its own connection to the
+pooler (NullPool), and asyncpg's prepared statements are made safe for
+connections that change server session between transactions.
+"""
+import time
+import uuid
+
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool
+
+from app.core import metrics
+from app.core.config import settings
+
+POOLS = ("queue", "external")
+PRE_PING = ("always", "idle", "never")
+
+def engine_options(connect_args: dict) -> dict:
+    """create_async_engine() options for a PostgreSQL URL, from settings."""
+    if settings.DB_POOL not in POOLS:
+        raise ValueError(f"DB_POOL must be one of {', '.join(POOLS)}, not {settings.DB_POOL!r}")
+    if settings.DB_POOL_PRE_PING not in PRE_PING:
+        raise ValueError(f"DB_POOL_PRE_PING must be one of {', '.join(PRE_PING)}, not {settings.DB_POOL_PRE_PING!r}")
+
+    if settings.DB_POOL == "external":
+        return {
+            "poolclass": NullPool,
+            "connect_args": {
+                **connect_args,
+                # The pooler may run each transaction on a different server
+                # connection, where statements this client prepared don't exist
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+            },
+        }
+    return {
+        "poolclass": metrics.TimedQueuePool if settings.METRICS_ENABLED else AsyncAdaptedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_POOL_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING == "always",
+        "connect_args": connect_args,
+    }
+
+def ping_idle_connections(engine: Engine, idle_seconds: float = settings.DB_POOL_PING_IDLE_SECONDS) -> None:
+    """
+    Ping connections that were idle in the pool for over `idle_seconds` when
+    they are checked out; dead ones are replaced before the request uses them.
+    """
+
+    @event.listens_for(engine, "checkin")
+    def checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            # The pool discards this connection and retries with a new one
+            raise exc.DisconnectionError() from e
+
+def install(engine: Engine) -> None:
+    """Add the pre-ping listeners for settings.DB_POOL_PRE_PING to a (sync) PostgreSQL engine."""
+    if settings.DB_POOL == "queue" and settings.DB_POOL_PRE_PING == "idle":
+        ping_idle_connections(engine)
+
+async def pool_timeout_handler(request: Request, error: exc.TimeoutError) -> JSONResponse:
+    """No pooled connection freed up within DB_POOL_TIMEOUT_SECONDS."""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "The database is busy, please retry"},
+        headers={"Retry-After": str(settings.DB_POOL_RETRY_AFTER_SECONDS)},
+    )
@@ -0,0 +1,188 @@
+"""
+Client-shaped responses: the `fields=` and `expand=` query parameters.
+
+Without them endpoints return their full nested schemas. With either, rows are
+flat (foreign keys instead of nested objects) and trimmed to `fields`, and the
+related objects named in `expand` are side-loaded into `included`, once per
+object however many rows point at it:
+
+    GET /orders/?fields=id,status,total_price,crop_id&expand=crop,crop.farmer
+    {"items": [{"id": 7, "status": "pending", "total_price": 12.5, "crop_id": 3}, ...],
+     "included": {"crops": [{"id": 3, "name": "Wheat", ..., "farmer_id": 2}],
+                  "users": [{"id": 2, "name": "Asha", "role": "farmer"}]}}
+
+Detail endpoints answer {"item": ..., "included": ...}. Every query selects
+only the columns it serializes, and included objects use the compact
+*Summary schemas.
+"""
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Type
+
+import pydantic_core
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.models import Crop, Order, Review, User
+from app.schemas.schemas import CropFlat, CropSummary, OrderFlat, ReviewFlat, UserSummary
+
+@dataclass
+class Resource:
+    model: Any
+    # Schema of the endpoint's own rows, and of the resource when side-loaded
+    flat: Type[BaseModel]
+    summary: Type[BaseModel]
+    # Key of the side-loaded objects in `included`
+    collection: str
+    # Expandable relation -> (foreign key column, related resource)
+    relations: Dict[str, Tuple[str, "Resource"]] = field(default_factory=dict)
+
+USERS = Resource(User, UserSummary, UserSummary, "users")
+CROPS = Resource(Crop, CropFlat, CropSummary, "crops", {"farmer": ("farmer_id", USERS)})
+ORDERS = Resource(Order, OrderFlat, OrderFlat, "orders", {"buyer": ("buyer_id", USERS), "crop": ("crop_id", CROPS)})
+REVIEWS = Resource(Review, ReviewFlat, ReviewFlat, "reviews", {
+    "buyer": ("buyer_id", USERS), "farmer": ("farmer_id", USERS), "order": ("order_id", ORDERS),
+})
+
+# Selected even when not requested: keyset pagination needs them
+ALWAYS_SELECTED = ("id", "created_at")
+
+def _bad_request(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+@dataclass
+class Projection:
+    resource: Resource
+    fields: Tuple[str, ...]
+    # relation -> nested expansions, e.g. {"crop": {"farmer": {}}}
+    expand: Dict[str, dict]
+
+    def select(self, query: Select) -> Select:
+        """Narrow the endpoint's ORM query to the columns this projection serializes."""
+        names = dict.fromkeys(
+            (*ALWAYS_SELECTED, *self.fields, *(self.resource.relations[name][0] for name in self.expand))
+        )
+        return query.with_only_columns(*(getattr(self.resource.model, name).label(name) for name in names))
+
+    async def page(self, db: AsyncSession, rows: Sequence[Any], response: Optional[Response] = None) -> Response:
+        headers = dict(response.headers) if response is not None else None
+        content = {
+            "items": _rows_adapter(self.resource.flat, self.fields).validate_python(rows, from_attributes=True),
+            "included": await _side_load(db, self.resource, rows, self.expand),
+        }
+        return Response(pydantic_core.to_json(content), media_type="application/json", headers=headers)
+
+    async def item(self, db: AsyncSession, row: Any) -> Response:
+        content = {
+            "item": _rows_adapter(self.resource.flat, self.fields).validate_python([row], from_attributes=True)[0],
+            "included": await _side_load(db, self.resource, [row], self.expand),
+        }
+        return Response(pydantic_core.to_json(content), media_type="application/json")
+
+    def cache_key(self) -> Tuple[str, str]:
+        return ",".join(self.fields), ",".join(_paths(self.expand))
+
+def _paths(tree: Dict[str, dict], prefix: str = "") -> List[str]:
+    paths = []
+    for name in sorted(tree):
+        paths.append(prefix + name)
+        paths.extend(_paths(tree[name], f"{prefix}{name}."))
+    return paths
+
+def _parse(resource: Resource, fields: Optional[str], expand: Optional[str]) -> Optional[Projection]:
+    if fields is None and expand is None:
+        return None
+    tree: Dict[str, dict] = {}
+    for path in filter(None, (path.strip() for path in (expand or "").split(","))):
+        node, current = tree, resource
+        for name in path.split("."):
+            if name not in current.relations:
+                raise _bad_request(
+                    f"Can't expand {path}; {current.collection} can expand: {', '.join(current.relations) or 'nothing'}"
+                )
+            node = node.setdefault(name, {})
+            current = current.relations[name][1]
+
+    available = list(resource.flat.model_fields)
+    if fields:
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested.difference(available))
+        if unknown:
+            raise _bad_request(f"Unknown fields {', '.join(unknown)}; available: {', '.join(available)}")
+        # Rows keep the keys that link them to their included objects
+        requested.update(["id", *(resource.relations[name][0] for name in tree)])
+        selected = tuple(name for name in available if name in requested)
+    else:
+        selected = tuple(available)
+    return Projection(resource, selected, tree)
+
+def projection_params(resource: Resource):
+    """Dependency parsing `fields=` and `expand=` for `resource`; None when neither is given."""
+    def dependency(
+        fields: Optional[str] = Query(None, description="Comma-separated fields of each row; returns flat rows"),
+        expand: Optional[str] = Query(
+            None,
+            description=f"Comma-separated relations to side-load into `included`: {', '.join(_paths_of(resource))}",
+        ),
+    ) -> Optional[Projection]:
+        return _parse(resource, fields, expand)
+    return dependency
+
+def _paths_of(resource: Resource, prefix: str = "", depth: int = 3) -> List[str]:
+    if depth == 0:
+        return []
+    paths = []
+    for name, (_, related) in resource.relations.items():
+        paths.append(prefix + name)
+        paths.extend(_paths_of(related, f"{prefix}{name}.", depth - 1))
+    return paths
+
+@lru_cache(maxsize=256)
+def _rows_adapter(schema: Type[BaseModel], fields: Tuple[str, ...]) -> TypeAdapter:
+    if fields == tuple(schema.model_fields):
+        return TypeAdapter(List[schema])
+    model = create_model(
+        f"{schema.__name__}Fields",
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in schema.model_fields.items() if name in fields},
+    )
+    return TypeAdapter(List[model])
+
+async def _side_load(db: AsyncSession, resource: Resource, rows: Sequence[Any], tree: Dict[str, dict]) -> Dict[str, list]:
+    """
+    Load the objects `tree` expands from `rows`, level by level, with one
+    query per resource and level. Objects reached along several paths (e.g.
+    a buyer that is also a crop's farmer) are loaded and listed once.
+    """
+    included: Dict[str, Tuple[Resource, Dict[int, Any]]] = {}
+    level = [(resource, rows, tree)]
+    while level:
+        # collection -> (resource, [(ids, nested expansions)] of every branch reaching it)
+        wanted: Dict[str, Tuple[Resource, List[Tuple[set, dict]]]] = {}
+        for current, current_rows, subtree in level:
+            for name, children in subtree.items():
+                key, related = current.relations[name]
+                ids = {getattr(row, key) for row in current_rows} - {None}
+                wanted.setdefault(related.collection, (related, []))[1].append((ids, children))
+
+        level = []
+        for collection, (related, branches) in wanted.items():
+            loaded = included.setdefault(collection, (related, {}))[1]
+            missing = set().union(*(ids for ids, _ in branches)) - loaded.keys()
+            if missing:
+                model = related.model
+                query = select(*(getattr(model, name).label(name) for name in related.summary.model_fields))
+                for row in await db.execute(query.filter(model.id.in_(missing))):
+                    loaded[row.id] = row
+            for ids, children in branches:
+                if children:
+                    level.append((related, [loaded[id] for id in ids if id in loaded], children))
+
+    return {
+        collection: _rows_adapter(related.summary, tuple(related.summary.model_fields)).validate_python(
+            sorted(objects.values(), key=lambda row: row.id), from_attributes=True
+        )
+        for collection, (related, objects) in included.items()
+    }
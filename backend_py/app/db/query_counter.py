@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+from typing import Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.session import engine as default_engine
+
+class QueryCounter:
+    """
+    Records every SQL statement sent to the database by an engine while active.
+    """
+
+    def __init__(self, engine: AsyncEngine = default_engine):
+        self.engine = engine.sync_engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+@contextmanager
+def assert_max_queries(expected: int, engine: AsyncEngine = default_engine) -> Iterator[QueryCounter]:
+    """
+    Fail if the wrapped block (e.g. one TestClient request) runs more than `expected` queries.
+
+        with assert_max_queries(4):
+            client.get("/api/v1/orders/?limit=100", headers=auth)
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    assert counter.count <= expected, (
+        f"Expected at most {expected} queries, got {counter.count}:\n"
+        + "\n".join(counter.statements)
+    )
@@ -0,0 +1,93 @@
+"""
+Structured SQL query logging, configured by settings.QUERY_LOG:
+
+    off      no listeners are installed; statements cost nothing extra
+    sampled  a random QUERY_LOG_SAMPLE_RATE of statements, at INFO
+    slow     statements slower than QUERY_LOG_SLOW_MS, at WARNING
+
+Records go to the "app.db.queries" logger with `duration_ms`, `route` (the
+request's `METHOD /path/{template}`, see app.core.request_context; null
+outside requests), `rows`
+and `statement` attributes; parameters are never logged. When nothing else
+configures that logger it writes one JSON object per record to stderr.
+"""
+import json
+import logging
+import random
+import re
+import time
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+from app.core.request_context import current_route
+
+logger = logging.getLogger("app.db.queries")
+
+MODES = ("off", "sampled", "slow")
+MAX_STATEMENT_LENGTH = 2000
+
+class JSONFormatter(logging.Formatter):
+    FIELDS = ("duration_ms", "route", "rows", "statement")
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            **{name: getattr(record, name) for name in self.FIELDS if hasattr(record, name)},
+        }
+        return json.dumps(entry)
+
+def _compact(statement: str) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        statement = statement[:MAX_STATEMENT_LENGTH] + "..."
+    return statement
+
+def install(
+    engine: Engine,
+    mode: str = settings.QUERY_LOG,
+    sample_rate: float = settings.QUERY_LOG_SAMPLE_RATE,
+    slow_ms: float = settings.QUERY_LOG_SLOW_MS,
+) -> None:
+    """Add the listeners for `mode` to a (sync) engine."""
+    if mode not in MODES:
+        raise ValueError(f"QUERY_LOG must be one of {', '.join(MODES)}, not {mode!r}")
+    if mode == "off":
+        return
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(JSONFormatter())
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+    level = logging.INFO if mode == "sampled" else logging.WARNING
+    threshold = slow_ms / 1000 if mode == "slow" else 0.0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def start(conn, cursor, statement, parameters, context, executemany):
+        if mode == "sampled" and random.random() >= sample_rate:
+            return
+        context._query_log_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def finish(conn, cursor, statement, parameters, context, executemany):
+        started: Optional[float] = getattr(context, "_query_log_start", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        if elapsed < threshold:
+            return
+        duration_ms = round(elapsed * 1000, 3)
+        route = current_route()
+        rows = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+        statement = _compact(statement)
+        logger.log(
+            level,
+            "SQL %.1f ms route=%s rows=%s: %s", duration_ms, route, rows, statement,
+            extra={"duration_ms": duration_ms, "route": route, "rows": rows, "statement": statement},
+        )
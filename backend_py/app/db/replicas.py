@@ -0,0 +1,90 @@
+"""
+Read replicas (settings.DATABASE_REPLICA_URLS) for read-only requests.
+
+Replicas are used round-robin. One that can't be connected to, or drops a
+connection mid-query, is skipped for REPLICA_RETRY_SECONDS, then tried again.
+A request that can't connect to its replica (also when the replica's pool is
+merely exhausted, which doesn't take it out of rotation), and all reads while
+every replica is down, go to the primary. Replicas lag the primary, so a user's reads stay on
+the primary for REPLICA_READ_YOUR_WRITES_SECONDS after each of their writes
+(see app.core.deps.get_read_db).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Errors raised while opening a connection that mean the replica is
+# unreachable. exc.TimeoutError is not one of them: it is the replica's own
+# pool being exhausted, a sign of load rather than of a dead server.
+CONNECT_ERRORS = (exc.OperationalError, exc.InterfaceError, OSError, asyncio.TimeoutError)
+
+def is_connect_error(error: BaseException) -> bool:
+    """`error`, raised while connecting to a replica, means it is down."""
+    return not isinstance(error, exc.TimeoutError) and isinstance(error, CONNECT_ERRORS)
+
+def is_disconnect(error: BaseException) -> bool:
+    """
+    `error`, raised by a query, means the replica's connection was lost (as
+    opposed to e.g. a statement timeout or a cancelled query).
+    """
+    return isinstance(error, exc.DBAPIError) and error.connection_invalidated
+
+class Replica:
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self.down_until = 0.0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+class ReplicaSet:
+    def __init__(self, engines: List[AsyncEngine], retry_after: float):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.retry_after = retry_after
+        self._next = 0
+
+    def __bool__(self) -> bool:
+        return bool(self.replicas)
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """The next healthy replica's engine, or None when all are down."""
+        now = time.monotonic()
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self._next % len(self.replicas)]
+            self._next += 1
+            if replica.down_until <= now:
+                return replica.engine
+        return None
+
+    def failed(self, engine: AsyncEngine, error: BaseException) -> None:
+        for replica in self.replicas:
+            if replica.engine is engine:
+                if replica.down_until <= time.monotonic():
+                    logger.warning(
+                        "Read replica %s failed, skipping it for %.0f s: %r",
+                        engine.url.render_as_string(hide_password=True), self.retry_after, error,
+                    )
+                replica.down_until = time.monotonic() + self.retry_after
+                replica.failures += 1
+                replica.last_error = repr(error)
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "url": replica.engine.url.render_as_string(hide_password=True),
+                "ok": replica.down_until <= now,
+                "failures": replica.failures,
+                "error": replica.last_error if replica.down_until > now else None,
+            }
+            for replica in self.replicas
+        ]
+
+    async def dispose(self) -> None:
+        for replica in self.replicas:
+            await replica.engine.dispose()
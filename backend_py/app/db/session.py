@@ -1,31 +1,102 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
+import logging
+from contextlib import AsyncExitStack
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker, AsyncSession
+from app.core import metrics
 from app.core.config import settings
+from app.db import pool, query_log
+from app.db.replicas import ReplicaSet
 import ssl
 
-# Create an SSL context for NeonDB
-ssl_context = ssl.create_default_context()
-ssl_context.verify_mode = ssl.CERT_REQUIRED
-
-# Create SQLAlchemy engine with the DATABASE_URL and SSL configuration
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=True,  # Set to False in production
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_size=5,  # Adjust based on your needs
-    max_overflow=10,  # Adjust based on your needs
-    connect_args={
-        "ssl": ssl_context,
-        "connect_timeout": 10  # Timeout in seconds
-    }
+logger = logging.getLogger(__name__)
+
+def get_async_database_url(database_url: str):
+    """
+    Map the configured DATABASE_URL onto an async driver.
+    postgresql:// URLs use asyncpg and sqlite:// URLs use aiosqlite (local/tests).
+    """
+    url = make_url(database_url)
+    if url.drivername in ("postgres", "postgresql", "postgresql+psycopg2"):
+        # asyncpg doesn't understand libpq's sslmode, SSL is set via connect_args
+        query = {k: v for k, v in url.query.items() if k not in ("sslmode", "channel_binding")}
+        url = url.set(drivername="postgresql+asyncpg", query=query)
+    elif url.drivername == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+def make_engine(url) -> AsyncEngine:
+    if url.get_backend_name() == "postgresql":
+        # Create an SSL context for NeonDB
+        ssl_context = ssl.create_default_context()
+        ssl_context.verify_mode = ssl.CERT_REQUIRED
+
+        # Pool size, overflow, timeouts and pre-ping come from settings, see app.db.pool
+        engine_options = pool.engine_options({
+            "ssl": ssl_context,
+            "timeout": 10  # Timeout in seconds
+        })
+    else:
+        engine_options = {}
+
+    engine = create_async_engine(
+        url,
+        echo=settings.SQL_ECHO,
+        **engine_options
+    )
+    if url.get_backend_name() == "postgresql":
+        pool.install(engine.sync_engine)
+    query_log.install(engine.sync_engine)
+    if settings.METRICS_ENABLED:
+        metrics.instrument_engine(engine.sync_engine)
+    return engine
+
+database_url = get_async_database_url(settings.DATABASE_URL)
+
+# Create async SQLAlchemy engine with the DATABASE_URL and SSL configuration
+engine = make_engine(database_url)
+
+# Optional read replicas for read-only requests, see app.db.replicas
+replicas = ReplicaSet(
+    [make_engine(get_async_database_url(url.strip())) for url in (settings.DATABASE_REPLICA_URLS or "").split(",") if url.strip()],
+    retry_after=settings.REPLICA_RETRY_SECONDS,
 )
 
-# Create SessionLocal class for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Create SessionLocal class for database sessions.
+# Objects stay usable after commit so handlers can return them without a reload.
+SessionLocal = async_sessionmaker(
+    bind=engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close() 
\ No newline at end of file
+
+def read_session(primary: bool = False) -> AsyncSession:
+    """
+    A session for read-only work: bound to the next healthy replica, or to
+    the primary when `primary` is set or no replica is available.
+    """
+    replica = replicas.choose() if replicas and not primary else None
+    return SessionLocal(bind=replica) if replica is not None else SessionLocal()
+
+async def warm_pool() -> None:
+    """
+    Open the pool's connections (TCP + TLS handshakes, waking a suspended
+    database) ahead of the first requests. Runs in the background after
+    startup; failures are only logged and requests connect on demand.
+    """
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    async with AsyncExitStack() as stack:
+        results = await asyncio.gather(
+            *(stack.enter_async_context(engine.connect()) for _ in range(size)),
+            return_exceptions=True,
+        )
+    errors = [result for result in results if isinstance(result, Exception)]
+    if errors:
+        logger.warning("Connection pool warm-up: %d of %d connections failed: %s", len(errors), size, errors[0])
+    else:
+        logger.info("Connection pool warm-up: %d connections ready", size)
@@ -0,0 +1,278 @@
+"""
+Crop stock reservations, race-free under concurrent requests.
+
+Crop.quantity is the stock on hand and Crop.reserved_quantity the part held by
+pending orders; what buyers can still order is available_quantity, the
+difference. Every change is a single conditional UPDATE that checks and
+writes in one statement, so two requests can never both claim the last units:
+
+    UPDATE crops SET reserved_quantity = reserved_quantity + :q
+    WHERE id = :id AND quantity - reserved_quantity >= :q
+
+Order status changes are claimed the same way (change_status), so the stock
+effect of a change is applied once however many requests or sweeps race on
+the same order.
+
+A pending order holds its reservation until Order.reserved_until. Expired
+reservations are released by release_expired(), which the order endpoints call
+before giving up on a crop and the app runs periodically:
+
+    python -m app.db.stock    # release expired reservations once
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core.config import settings
+from app.core.response_cache import invalidate_crops
+from app.db.session import SessionLocal, engine
+from app.models.models import Crop, Order
+
+logger = logging.getLogger(__name__)
+
+# What an order holds against its crop, given its status and reservation
+RESERVED = "reserved"
+TAKEN = "taken"
+
+def not_enough_stock() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Not enough quantity available"
+    )
+
+def holding(order_status: str, reserved_until: Optional[datetime]) -> Optional[str]:
+    if order_status in ("accepted", "completed"):
+        return TAKEN
+    if order_status == "pending" and reserved_until is not None:
+        return RESERVED
+    return None
+
+def invalid_quantity() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Quantity must be positive"
+    )
+
+def order_changed() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail="The order was changed concurrently, please retry"
+    )
+
+def reservation_deadline() -> datetime:
+    return datetime.now(timezone.utc) + timedelta(minutes=settings.ORDER_RESERVATION_MINUTES)
+
+async def _claim(db: AsyncSession, crop_id: int, amount: float, values: dict) -> bool:
+    if not amount > 0:
+        # A negative claim would add stock: refuse it whatever the caller validated
+        raise invalid_quantity()
+    result = await db.execute(
+        update(Crop)
+        .where(Crop.id == crop_id, Crop.quantity - Crop.reserved_quantity >= amount)
+        .values(values)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def reserve(db: AsyncSession, crop_id: int, quantity: float) -> bool:
+    """
+    Hold `quantity` for a pending order. False when not enough is available;
+    raises 400 unless `quantity` is positive.
+    """
+    return await _claim(db, crop_id, quantity, {Crop.reserved_quantity: Crop.reserved_quantity + quantity})
+
+async def take(db: AsyncSession, crop_id: int, quantity: float) -> bool:
+    """
+    Remove `quantity` from stock for an accepted order. False when not enough
+    is available; raises 400 unless `quantity` is positive.
+    """
+    return await _claim(db, crop_id, quantity, {Crop.quantity: Crop.quantity - quantity})
+
+async def release(db: AsyncSession, crop_id: int, quantity: float) -> None:
+    await db.execute(
+        update(Crop)
+        .where(Crop.id == crop_id)
+        .values(reserved_quantity=Crop.reserved_quantity - quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+async def restock(db: AsyncSession, crop_id: int, quantity: float) -> None:
+    await db.execute(
+        update(Crop)
+        .where(Crop.id == crop_id)
+        .values(quantity=Crop.quantity + quantity)
+        .execution_options(synchronize_session=False)
+    )
+
+async def set_quantity(db: AsyncSession, crop_id: int, quantity: float) -> bool:
+    """Set the stock on hand, refusing to drop below what pending orders hold."""
+    result = await db.execute(
+        update(Crop)
+        .where(Crop.id == crop_id, Crop.reserved_quantity <= quantity)
+        .values(quantity=quantity)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+async def _claim_or_sweep(db: AsyncSession, crop_id: int, claim) -> bool:
+    if await claim():
+        return True
+    # Expired reservations on this crop may free enough; the order's own
+    # pending changes are flushed first so the sweep sees them
+    await db.flush()
+    if await release_expired(db, crop_id):
+        return await claim()
+    return False
+
+async def place(db: AsyncSession, order: Order) -> None:
+    """
+    Claim stock for a new order: a reservation when it is pending, the
+    quantity itself when it is created accepted. Raises 400 when not enough
+    is available.
+    """
+    if order.status == "pending":
+        if not await _claim_or_sweep(db, order.crop_id, lambda: reserve(db, order.crop_id, order.quantity)):
+            raise not_enough_stock()
+        order.reserved_until = reservation_deadline()
+    elif holding(order.status, None) == TAKEN:
+        if not await _claim_or_sweep(db, order.crop_id, lambda: take(db, order.crop_id, order.quantity)):
+            raise not_enough_stock()
+
+async def place_all(db: AsyncSession, orders: List[Order]) -> List[int]:
+    """
+    Reserve stock for many new pending orders with one claim per crop.
+    Returns the ids of the crops that can't cover their orders; the other
+    claims have been made by then, so the caller must roll back.
+    """
+    wanted: Dict[int, float] = defaultdict(float)
+    for order in orders:
+        wanted[order.crop_id] += order.quantity
+    short = []
+    for crop_id in sorted(wanted):
+        if not await _claim_or_sweep(db, crop_id, lambda: reserve(db, crop_id, wanted[crop_id])):
+            short.append(crop_id)
+    deadline = reservation_deadline()
+    for order in orders:
+        order.reserved_until = deadline
+    return short
+
+async def _claim_status(db: AsyncSession, order: Order, new_status: str) -> bool:
+    # Matches only while the order still has the status and reservation it
+    # was read with; a concurrent update or sweep makes it miss
+    reserved_until = (
+        Order.reserved_until.is_(None) if order.reserved_until is None
+        else Order.reserved_until == order.reserved_until
+    )
+    result = await db.execute(
+        update(Order)
+        .where(Order.id == order.id, Order.status == order.status, reserved_until)
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return False
+    set_committed_value(order, "status", new_status)
+    return True
+
+async def change_status(db: AsyncSession, order: Order, new_status: str, attempts: int = 3) -> Tuple[str, Optional[str]]:
+    """
+    Set an order's status with a conditional UPDATE, re-reading the order when
+    a concurrent request or sweep changed it first. Returns the status and
+    holding it was changed from, to pass on to transition(). Raises 409 when
+    the order keeps changing under it.
+    """
+    for _ in range(attempts):
+        old_status, old_holding = order.status, holding(order.status, order.reserved_until)
+        if await _claim_status(db, order, new_status):
+            return old_status, old_holding
+        await db.execute(
+            select(Order)
+            .options(joinedload(Order.crop))
+            .filter(Order.id == order.id)
+            .execution_options(populate_existing=True)
+        )
+    raise order_changed()
+
+async def transition(db: AsyncSession, order: Order, old_holding: Optional[str]) -> bool:
+    """
+    Move stock for an order whose status changed (see change_status): give
+    back what it held before, then claim what its new status needs. Returns whether the crop's
+    stock changed. Raises 400 when the claim can't be met; the caller's
+    transaction is then rolled back as a whole.
+    """
+    if order.status in ("accepted", "completed"):
+        new_holding = TAKEN
+    elif order.status == "pending" and old_holding == RESERVED:
+        new_holding = RESERVED
+    else:
+        new_holding = None
+    if old_holding == new_holding:
+        return False
+
+    if old_holding == RESERVED:
+        await release(db, order.crop_id, order.quantity)
+    elif old_holding == TAKEN:
+        await restock(db, order.crop_id, order.quantity)
+    order.reserved_until = None
+
+    if new_holding == TAKEN:
+        if not await _claim_or_sweep(db, order.crop_id, lambda: take(db, order.crop_id, order.quantity)):
+            raise not_enough_stock()
+    return True
+
+async def release_expired(db: AsyncSession, crop_id: Optional[int] = None) -> Dict[int, float]:
+    """
+    Release the reservations of pending orders past their deadline, for one
+    crop or all of them. Each order is claimed by the UPDATE that clears its
+    deadline, so concurrent sweeps never release the same order twice.
+    Returns the quantity released per crop; the caller commits.
+    """
+    query = (
+        update(Order)
+        .where(Order.status == "pending", Order.reserved_until < datetime.now(timezone.utc))
+        .values(reserved_until=None)
+        .returning(Order.crop_id, Order.quantity)
+        .execution_options(synchronize_session=False)
+    )
+    if crop_id is not None:
+        query = query.where(Order.crop_id == crop_id)
+    released: Dict[int, float] = defaultdict(float)
+    for expired_crop_id, quantity in await db.execute(query):
+        released[expired_crop_id] += quantity
+    for expired_crop_id, quantity in released.items():
+        await release(db, expired_crop_id, quantity)
+    return dict(released)
+
+async def sweep_forever(interval: float) -> None:
+    """Background task releasing expired reservations every `interval` seconds."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                released = await release_expired(db)
+                await db.commit()
+            if released:
+                await invalidate_crops(*released)
+                logger.info("Released expired stock reservations on %d crop(s)", len(released))
+        except Exception:
+            logger.exception("Releasing expired stock reservations failed")
+
+async def main() -> int:
+    engine.echo = False
+    async with SessionLocal() as db:
+        released = await release_expired(db)
+        await db.commit()
+    await engine.dispose()
+    print(f"Expired reservations released on {len(released)} crop(s)")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main()))
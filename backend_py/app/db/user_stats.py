@@ -0,0 +1,139 @@
+"""
+Incrementally maintained per-user dashboard counters (the user_stats table).
+
+Write paths call bump() inside their own transaction so the counters commit or
+roll back together with the rows they describe. rebuild() recomputes every
+counter from the raw tables; run it after deploying to an existing database
+and periodically to detect drift:
+
+    python -m app.db.user_stats --check    # report drift, exit 1 if any
+    python -m app.db.user_stats            # report drift and rewrite counters
+"""
+import argparse
+import asyncio
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import select, func, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import SessionLocal, engine
+from app.models.models import Crop, Order, Review, UserStats
+
+ORDER_STATUSES = ["pending", "accepted", "rejected", "completed"]
+COUNTERS = [column.name for column in UserStats.__table__.columns if column.name != "user_id"]
+
+def status_counter(status: str) -> str:
+    return f"{status}_orders"
+
+async def bump(db: AsyncSession, user_id: int, **deltas) -> None:
+    """
+    Atomically add `deltas` to a user's counters, creating the row on first use.
+    """
+    dialect = postgresql if db.bind.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(UserStats).values(user_id=user_id, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[UserStats.user_id],
+        set_={name: getattr(UserStats, name) + stmt.excluded[name] for name in deltas},
+    )
+    await db.execute(stmt)
+
+async def order_placed(db: AsyncSession, order: Order, farmer_id: int) -> None:
+    deltas = {"total_orders": 1, status_counter(order.status): 1, "revenue": order.total_price}
+    await bump(db, order.buyer_id, **deltas)
+    await bump(db, farmer_id, **deltas)
+
+async def orders_placed(db: AsyncSession, orders: Iterable[Tuple[Order, int]]) -> None:
+    """
+    order_placed() for many (order, farmer_id) pairs, bumping each user involved once.
+    """
+    deltas: Dict[int, Counter] = defaultdict(Counter)
+    for order, farmer_id in orders:
+        for user_id in (order.buyer_id, farmer_id):
+            deltas[user_id].update({"total_orders": 1, status_counter(order.status): 1})
+            deltas[user_id]["revenue"] += order.total_price
+    for user_id, user_deltas in deltas.items():
+        await bump(db, user_id, **user_deltas)
+
+async def order_status_changed(db: AsyncSession, order: Order, farmer_id: int, old_status: str) -> None:
+    if old_status == order.status:
+        return
+    deltas = {status_counter(old_status): -1, status_counter(order.status): 1}
+    await bump(db, order.buyer_id, **deltas)
+    await bump(db, farmer_id, **deltas)
+
+async def review_rated(db: AsyncSession, review: Review, rating_delta: int, new: bool = False) -> None:
+    if not rating_delta and not new:
+        return
+    deltas = {"rating_sum": rating_delta}
+    if new:
+        deltas["total_reviews"] = 1
+    await bump(db, review.buyer_id, **deltas)
+    await bump(db, review.farmer_id, **deltas)
+
+async def compute(db: AsyncSession) -> Dict[int, Dict[str, float]]:
+    """
+    Recompute every user's counters from the crops, orders and reviews tables.
+    """
+    stats = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+
+    for farmer_id, count in await db.execute(select(Crop.farmer_id, func.count(Crop.id)).group_by(Crop.farmer_id)):
+        stats[farmer_id]["total_crops"] = count
+
+    by_buyer = select(Order.buyer_id, Order.status, func.count(Order.id), func.sum(Order.total_price)).group_by(Order.buyer_id, Order.status)
+    by_farmer = select(Crop.farmer_id, Order.status, func.count(Order.id), func.sum(Order.total_price)).join(Order.crop).group_by(Crop.farmer_id, Order.status)
+    for query in (by_buyer, by_farmer):
+        for user_id, status, count, total in await db.execute(query):
+            stats[user_id]["total_orders"] += count
+            stats[user_id][status_counter(status)] += count
+            stats[user_id]["revenue"] += total
+
+    for column in (Review.buyer_id, Review.farmer_id):
+        for user_id, count, rating_sum in await db.execute(select(column, func.count(Review.id), func.sum(Review.rating)).group_by(column)):
+            stats[user_id]["total_reviews"] += count
+            stats[user_id]["rating_sum"] += rating_sum
+
+    stats.pop(None, None)
+    return dict(stats)
+
+async def rebuild(db: AsyncSession, write: bool = True) -> List[str]:
+    """
+    Compare stored counters with freshly computed ones, optionally replacing them.
+    Returns a description of every drifted counter.
+    """
+    expected = await compute(db)
+    stored = {
+        row.user_id: {name: getattr(row, name) for name in COUNTERS}
+        for row in await db.scalars(select(UserStats))
+    }
+
+    drift = []
+    zeros = dict.fromkeys(COUNTERS, 0)
+    for user_id in sorted(expected.keys() | stored.keys()):
+        want, have = expected.get(user_id, zeros), stored.get(user_id, zeros)
+        for name in COUNTERS:
+            if abs(want[name] - have[name]) > 1e-6:
+                drift.append(f"user {user_id}: {name} is {have[name]}, expected {want[name]}")
+
+    if write:
+        await db.execute(delete(UserStats))
+        if expected:
+            await db.execute(insert(UserStats), [{"user_id": user_id, **counters} for user_id, counters in expected.items()])
+        await db.commit()
+    return drift
+
+async def main(check: bool) -> int:
+    engine.echo = False
+    async with SessionLocal() as db:
+        drift = await rebuild(db, write=not check)
+    await engine.dispose()
+    for line in drift:
+        print(line)
+    print(f"{len(drift)} drifted counter(s)" + ("" if check else ", counters rebuilt"))
+    return 1 if check and drift else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute the user_stats dashboard counters.")
+    parser.add_argument("--check", action="store_true", help="only report drift, don't rewrite the counters")
+    raise SystemExit(asyncio.run(main(parser.parse_args().check)))
@@ -1,18 +1,49 @@
-from fastapi import FastAPI, Depends
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, status
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 import os
-from pathlib import Path
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy import exc
 
+from app.core import metrics
 from app.core.config import settings
+from app.core.health import DatabaseProbe, readiness
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.request_context import RequestContextMiddleware
+from app.core.serialization import FastJSONResponse
+from app.core.uploads import UPLOAD_ROOT, UploadFiles, UploadSizeLimitMiddleware
 from app.api.api_v1.api import api_router
-from app.db.session import engine, get_db
+from app.db.pool import pool_timeout_handler
+from app.db.session import engine, replicas, warm_pool
+from app.db.stock import sweep_forever
 from app.models import models
 
-# Create tables
-models.BaseModel.metadata.create_all(bind=engine)
+database_probe = DatabaseProbe(
+    engine,
+    interval=settings.HEALTH_PROBE_INTERVAL_SECONDS,
+    timeout=settings.HEALTH_PROBE_TIMEOUT_SECONDS,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup doesn't wait on the database: the schema comes from migrations
+    # and the pool is filled in the background while requests are served.
+    if settings.DB_SCHEMA_ON_STARTUP == "create":
+        async with engine.begin() as conn:
+            await conn.run_sync(models.BaseModel.metadata.create_all)
+    tasks = [
+        asyncio.create_task(warm_pool()),
+        asyncio.create_task(sweep_forever(settings.RESERVATION_SWEEP_SECONDS)),
+        asyncio.create_task(database_probe.run_forever()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await engine.dispose()
+    await replicas.dispose()
 
 app = FastAPI(
     title="FarmSync API",
@@ -20,8 +51,16 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse if settings.FAST_JSON_RESPONSES else JSONResponse,
 )
 
+# Requests that can't get a pooled connection in time fail fast with 503
+app.add_exception_handler(exc.TimeoutError, pool_timeout_handler)
+
+# Reject oversized photo uploads before their body is read
+app.add_middleware(UploadSizeLimitMiddleware)
+
 # Set up CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,12 +68,19 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
+# Lets the query log attribute statements to routes
+app.add_middleware(RequestContextMiddleware)
+
+# Outermost, so request latency covers every other middleware
+if settings.METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Mount static files directory for uploads
-uploads_dir = Path(__file__).parent.parent / "uploads"
-uploads_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(uploads_dir)), name="uploads")
+UPLOAD_ROOT.mkdir(exist_ok=True)
+app.mount("/uploads", UploadFiles(directory=str(UPLOAD_ROOT)), name="uploads")
 
 # Include API router
 app.include_router(api_router, prefix="/api/v1")
@@ -48,12 +94,37 @@ async def root():
         "api_prefix": "/api/v1"
     }
 
-@app.get("/health")
-async def health_check(db: Session = Depends(get_db)):
-    try:
-        # Try to make a simple query using SQLAlchemy's text function
-        result = db.execute(text("SELECT 1"))
-        result.scalar()  # Actually execute the query
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+    async def metrics_endpoint():
+        return PlainTextResponse(metrics.render(engine.sync_engine), media_type="text/plain; version=0.0.4")
+
+@app.get("/livez")
+async def liveness():
+    """The process is up and its event loop responsive; no I/O."""
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readiness_check():
+    """
+    Whether this worker can serve requests: the last background database
+    probe, pool usage and the upload directory (see app.core.health). 503
+    while the database is unreachable or not probed yet.
+    """
+    report = readiness(database_probe, replicas)
+    code = status.HTTP_200_OK if report["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(report, status_code=code)
+
+@app.get("/health", include_in_schema=False)
+async def health_check():
+    """
+    Legacy health check, kept with its original contract for existing
+    monitors: always 200, with "healthy" or "unhealthy" in the body. Answers
+    from the background database probe; new probes should use /livez and /readyz.
+    """
+    if database_probe.checked_at is None:
+        await database_probe.check()
+    database = database_probe.status()
+    if database["ok"]:
         return {"status": "healthy", "database": "connected"}
-    except Exception as e:
-        return {"status": "unhealthy", "database": str(e)} 
\ No newline at end of file
+    return {"status": "unhealthy", "database": database["error"] or "probe stalled"} 
\ No newline at end of file
@@ -1,6 +1,13 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, ForeignKey, Text, CheckConstraint, and_
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import Column, String, Integer, Float, Numeric, Boolean, DateTime, ForeignKey, Text, CheckConstraint, Index, and_, func, literal_column
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
-from .base import BaseModel
+from .base import Base, BaseModel
+
+# Many-to-one relationships never lazy-load: AsyncSession can't emit SQL on
+# attribute access, and a forgotten loader would mean one SELECT per row.
+# Queries pick what to load from the profiles in app.db.loaders.
 
 class User(BaseModel):
     __tablename__ = "users"
@@ -19,6 +26,31 @@ class User(BaseModel):
     
     __table_args__ = (
         CheckConstraint(role.in_(['farmer', 'buyer', 'admin']), name='valid_role'),
+        # Keyset pagination on (created_at, id), see app.core.pagination
+        Index('ix_users_created_at_id', 'created_at', 'id'),
+    )
+
+# Money is fixed-point to the cent, read back as Decimal
+Money = Numeric(12, 2)
+CENT = Decimal("0.01")
+
+def order_total(price: Decimal, quantity: float) -> Decimal:
+    """Price of `quantity` units at `price`, rounded half up to the cent."""
+    if not quantity > 0:
+        # Stored totals feed the revenue counters, which must never go down
+        raise ValueError(f"Order quantity must be positive, not {quantity!r}")
+    return (Decimal(price) * Decimal(str(quantity))).quantize(CENT, rounding=ROUND_HALF_UP)
+
+def search_document(name, description):
+    """
+    Full-text document for marketplace search. Literals are inlined so queries
+    render the exact expression of the GIN index and the planner can use it.
+    """
+    return func.to_tsvector(
+        literal_column("'english'"),
+        func.coalesce(name, literal_column("''"))
+        .op("||")(literal_column("' '"))
+        .op("||")(func.coalesce(description, literal_column("''"))),
     )
 
 class Crop(BaseModel):
@@ -27,7 +59,9 @@ class Crop(BaseModel):
     name = Column(String(100), nullable=False)
     description = Column(Text)
     quantity = Column(Float, nullable=False)
-    price = Column(Float, nullable=False)
+    # Held by pending orders, see app.db.stock
+    reserved_quantity = Column(Float, nullable=False, default=0, server_default="0")
+    price = Column(Money, nullable=False)
     unit = Column(String(20), nullable=False)
     category = Column(String(50), nullable=False)
     photo = Column(String(255))
@@ -35,25 +69,52 @@ class Crop(BaseModel):
     farmer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     
     # Relationships
-    farmer = relationship("User", back_populates="crops")
+    farmer = relationship("User", back_populates="crops", lazy="raise_on_sql")
     orders = relationship("Order", back_populates="crop")
 
+    @hybrid_property
+    def available_quantity(self):
+        return self.quantity - self.reserved_quantity
+    
+    # Marketplace queries only ever read published crops, so those indexes are
+    # partial; farmers' own crops and orders are reached through farmer_id.
+    __table_args__ = (
+        Index('ix_crops_published_created_at_id', 'created_at', 'id',
+              postgresql_where=published_to_marketplace == True, sqlite_where=published_to_marketplace == True),
+        Index('ix_crops_published_category_price', 'category', 'price',
+              postgresql_where=published_to_marketplace == True, sqlite_where=published_to_marketplace == True),
+        Index('ix_crops_farmer_id_category', 'farmer_id', 'category'),
+        Index('ix_crops_search', search_document(name, description), postgresql_using='gin',
+              postgresql_where=published_to_marketplace == True).ddl_if(dialect='postgresql'),
+    )
+
 class Order(BaseModel):
     __tablename__ = "orders"
     
     quantity = Column(Float, nullable=False)
-    total_price = Column(Float, nullable=False)
+    # Snapshot of the crop's price when the order was placed; total_price is
+    # computed from it server-side. NULL for orders placed before snapshots.
+    unit_price = Column(Money)
+    total_price = Column(Money, nullable=False)
     status = Column(String(20), nullable=False)
     buyer_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     crop_id = Column(Integer, ForeignKey("crops.id", ondelete="CASCADE"))
+    # Set while a pending order holds a stock reservation
+    reserved_until = Column(DateTime(timezone=True))
     
     # Relationships
-    buyer = relationship("User", back_populates="orders_as_buyer")
-    crop = relationship("Crop", back_populates="orders")
+    buyer = relationship("User", back_populates="orders_as_buyer", lazy="raise_on_sql")
+    crop = relationship("Crop", back_populates="orders", lazy="raise_on_sql")
     reviews = relationship("Review", back_populates="order")
     
     __table_args__ = (
         CheckConstraint(status.in_(['pending', 'accepted', 'rejected', 'completed']), name='valid_status'),
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+        Index('ix_orders_buyer_id_created_at_id', 'buyer_id', 'created_at', 'id'),
+        Index('ix_orders_crop_id_created_at_id', 'crop_id', 'created_at', 'id'),
+        Index('ix_orders_pending_reserved_until', 'reserved_until',
+              postgresql_where=and_(status == 'pending', reserved_until.isnot(None)),
+              sqlite_where=and_(status == 'pending', reserved_until.isnot(None))),
     )
 
 class Review(BaseModel):
@@ -66,10 +127,33 @@ class Review(BaseModel):
     order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"))
     
     # Relationships
-    buyer = relationship("User", back_populates="reviews_as_buyer", foreign_keys=[buyer_id])
-    farmer = relationship("User", back_populates="reviews_as_farmer", foreign_keys=[farmer_id])
-    order = relationship("Order", back_populates="reviews")
+    buyer = relationship("User", back_populates="reviews_as_buyer", foreign_keys=[buyer_id], lazy="raise_on_sql")
+    farmer = relationship("User", back_populates="reviews_as_farmer", foreign_keys=[farmer_id], lazy="raise_on_sql")
+    order = relationship("Order", back_populates="reviews", lazy="raise_on_sql")
     
     __table_args__ = (
         CheckConstraint(and_(rating >= 1, rating <= 5), name='valid_rating'),
-    ) 
\ No newline at end of file
+        Index('ix_reviews_created_at_id', 'created_at', 'id'),
+        Index('ix_reviews_buyer_id_created_at_id', 'buyer_id', 'created_at', 'id'),
+        Index('ix_reviews_farmer_id_created_at_id', 'farmer_id', 'created_at', 'id'),
+        # One review per order is checked on every review submission
+        Index('ix_reviews_order_id', 'order_id'),
+    )
+
+# Dashboard counters for one user, kept in step with the write paths by
+# app.db.user_stats. For a farmer, orders and reviews are those on their crops;
+# for a buyer, those they placed. Revenue is the farmer's takings or the
+# buyer's spend over all orders.
+class UserStats(Base):
+    __tablename__ = "user_stats"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    total_crops = Column(Integer, nullable=False, default=0, server_default="0")
+    total_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    accepted_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    rejected_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    completed_orders = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Money, nullable=False, default=0, server_default="0")
+    total_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,7 +1,18 @@
-from typing import Optional, List
-from pydantic import BaseModel, EmailStr, Field
+from datetime import datetime
+from decimal import Decimal
+from typing import Annotated, Any, Optional, List
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, PlainSerializer
 from .base import BaseSchema
 
+# Exact to the cent in Python and the database, still a number in JSON
+Money = Annotated[
+    Decimal,
+    Field(max_digits=12, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used="json"),
+]
+# For prices and totals coming in: a stored unit_price * quantity is never negative
+NonNegativeMoney = Annotated[Money, Field(ge=0)]
+
 # User schemas
 class UserBase(BaseModel):
     name: str
@@ -19,51 +30,116 @@ class UserUpdate(BaseModel):
     password: Optional[str] = None
 
 class User(UserBase, BaseSchema):
-    pass
+    # Emails were validated on the way in; re-running EmailStr's validator for
+    # every user embedded in a response was most of the cost of serializing it
+    email: str = Field(..., json_schema_extra={"format": "email"})
+
+class UserSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    role: str
 
 # Crop schemas
 class CropBase(BaseModel):
     name: str
     description: Optional[str] = None
     quantity: float
-    price: float
+    price: Money
     unit: str
     category: str
     photo: Optional[str] = None
     published_to_marketplace: bool = False
 
 class CropCreate(CropBase):
+    # Checked on input only, so crops stored before the check still read back
+    price: NonNegativeMoney
     farmer_id: int
 
 class CropUpdate(BaseModel):
     name: Optional[str] = None
     description: Optional[str] = None
     quantity: Optional[float] = None
-    price: Optional[float] = None
+    price: Optional[NonNegativeMoney] = None
     unit: Optional[str] = None
     category: Optional[str] = None
     photo: Optional[str] = None
     published_to_marketplace: Optional[bool] = None
 
-class Crop(CropBase, BaseSchema):
+# *Flat schemas are rows without nested objects, for fields=/expand= responses
+class CropFlat(CropBase, BaseSchema):
+    reserved_quantity: float = 0
+    available_quantity: float
     farmer_id: int
+
+class Crop(CropFlat):
     farmer: User
 
+class CropSummary(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    name: str
+    price: Money
+    unit: str
+    category: str
+    photo: Optional[str] = None
+    available_quantity: float
+    farmer_id: int
+
+class CategoryFacet(BaseModel):
+    category: str
+    count: int
+
+class CropSearchResults(BaseModel):
+    items: List[Crop]
+    total: int
+    categories: List[CategoryFacet]
+
+class CropImportRow(BaseModel):
+    row: int
+    status: str = Field(..., pattern="^(created|updated|failed)$")
+    id: Optional[int] = None
+    errors: Optional[List[Any]] = None
+
+class CropImportResults(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    rows: List[CropImportRow]
+
 # Order schemas
 class OrderBase(BaseModel):
     quantity: float
-    total_price: float
     status: str = Field(..., pattern="^(pending|accepted|rejected|completed)$")
     buyer_id: int
     crop_id: int
 
 class OrderCreate(OrderBase):
-    pass
+    # Checked on input only, so orders stored before the check still read back
+    quantity: float = Field(..., gt=0)
+    # total_price is computed from the crop's current price; a value sent by
+    # older clients is ignored
 
 class OrderUpdate(BaseModel):
     status: Optional[str] = Field(None, pattern="^(pending|accepted|rejected|completed)$")
 
-class Order(OrderBase, BaseSchema):
+class CartItem(BaseModel):
+    crop_id: int
+    quantity: float = Field(..., gt=0)
+    # The total the buyer was shown; checkout fails if the price has changed since
+    total_price: Optional[NonNegativeMoney] = None
+
+class CartCheckout(BaseModel):
+    items: List[CartItem] = Field(..., min_length=1, max_length=100)
+
+class OrderFlat(OrderBase, BaseSchema):
+    unit_price: Optional[Money] = None
+    total_price: Money
+    reserved_until: Optional[datetime] = None
+
+class Order(OrderFlat):
     buyer: User
     crop: Crop
 
@@ -82,7 +158,10 @@ class ReviewUpdate(BaseModel):
     rating: Optional[int] = Field(None, ge=1, le=5)
     comment: Optional[str] = None
 
-class Review(ReviewBase, BaseSchema):
+class ReviewFlat(ReviewBase, BaseSchema):
+    pass
+
+class Review(ReviewFlat):
     buyer: User
     farmer: User
     order: Order
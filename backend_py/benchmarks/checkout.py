@@ -0,0 +1,79 @@
+"""
+Check out a cart of --items crops the old way (one POST /orders/ per item)
+and through POST /orders/checkout, and compare latency and SQL statements per
+cart. Carts are checked out one after another by different buyers.
+
+    python -m benchmarks.checkout --items 20 --carts 20
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.checkout
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from benchmarks.seed import seed
+
+import httpx
+from sqlalchemy import select
+
+from app.core.security import create_access_token
+from app.db.query_counter import QueryCounter
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.models import Crop, User
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+async def per_item(client, headers, cart):
+    for item in cart:
+        response = await client.post("/api/v1/orders/", headers=headers, json={
+            **item, "status": "pending", "buyer_id": 0,
+        })
+        response.raise_for_status()
+
+async def checkout(client, headers, cart):
+    response = await client.post("/api/v1/orders/checkout", headers=headers, json={"items": cart})
+    response.raise_for_status()
+
+async def main(args):
+    await seed(farmers=20, buyers=args.carts, crops_per_farmer=10, orders=0)
+    engine.echo = False
+    rng = random.Random(args.seed)
+    async with SessionLocal() as db:
+        crops = (await db.execute(select(Crop.id, Crop.price).filter(Crop.published_to_marketplace == True))).all()
+        buyers = (await db.scalars(select(User.email).filter(User.role == "buyer"))).all()
+
+    def cart():
+        return [
+            {"crop_id": crop.id, "quantity": 1, "total_price": float(crop.price)}
+            for crop in rng.sample(crops, args.items)
+        ]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, place in (("per-item", per_item), ("checkout", checkout)):
+            latencies, queries = [], []
+            for email in buyers:
+                headers = auth(email)
+                with QueryCounter() as counter:
+                    start = time.perf_counter()
+                    await place(client, headers, cart())
+                    latencies.append((time.perf_counter() - start) * 1000)
+                queries.append(counter.count)
+            print(f"{name:9} {args.items} items x {len(buyers)} carts: "
+                  f"p50 {percentile(latencies, 50):.1f} ms  p95 {percentile(latencies, 95):.1f} ms  "
+                  f"mean {statistics.fmean(latencies):.1f} ms  {statistics.fmean(queries):.0f} queries/cart")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--carts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""
+Round-trips and latency of /dashboard/stats and /dashboard/analytics, comparing
+the original one-query-per-number implementation with the combined aggregates
+and the user_stats counters.
+
+    python -m benchmarks.dashboard
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.dashboard --orders 50000
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.seed import seed
+
+from sqlalchemy import select, func
+
+from app.api.api_v1.endpoints.dashboard import get_dashboard_stats, get_dashboard_analytics
+from app.db import loaders
+from app.db.query_counter import QueryCounter
+from app.db.session import SessionLocal, engine
+from app.models.models import User, Crop, Order, Review
+from app.schemas.schemas import Order as OrderSchema, Review as ReviewSchema
+
+async def legacy_stats(db, current_user):
+    async def recent(query):
+        return [OrderSchema.model_validate(o) for o in await db.scalars(query.options(*loaders.ORDER_LIST).order_by(Order.created_at.desc()).limit(5))]
+
+    async def recent_reviews(query):
+        return [ReviewSchema.model_validate(r) for r in await db.scalars(query.options(*loaders.REVIEW_LIST).order_by(Review.created_at.desc()).limit(5))]
+
+    if current_user.role == "admin":
+        return {
+            "total_users": await db.scalar(select(func.count(User.id))),
+            "total_farmers": await db.scalar(select(func.count(User.id)).filter(User.role == "farmer")),
+            "total_buyers": await db.scalar(select(func.count(User.id)).filter(User.role == "buyer")),
+            "total_crops": await db.scalar(select(func.count(Crop.id))),
+            "total_orders": await db.scalar(select(func.count(Order.id))),
+            "total_reviews": await db.scalar(select(func.count(Review.id))),
+            "recent_orders": await recent(select(Order)),
+            "recent_reviews": await recent_reviews(select(Review)),
+        }
+    elif current_user.role == "farmer":
+        return {
+            "total_crops": await db.scalar(select(func.count(Crop.id)).filter(Crop.farmer_id == current_user.id)),
+            "total_orders": await db.scalar(select(func.count(Order.id)).join(Crop).filter(Crop.farmer_id == current_user.id)),
+            "total_reviews": await db.scalar(select(func.count(Review.id)).filter(Review.farmer_id == current_user.id)),
+            "recent_orders": await recent(select(Order).join(Crop).filter(Crop.farmer_id == current_user.id)),
+            "recent_reviews": await recent_reviews(select(Review).filter(Review.farmer_id == current_user.id)),
+        }
+    else:
+        return {
+            "total_orders": await db.scalar(select(func.count(Order.id)).filter(Order.buyer_id == current_user.id)),
+            "total_reviews": await db.scalar(select(func.count(Review.id)).filter(Review.buyer_id == current_user.id)),
+            "recent_orders": await recent(select(Order).filter(Order.buyer_id == current_user.id)),
+            "recent_reviews": await recent_reviews(select(Review).filter(Review.buyer_id == current_user.id)),
+        }
+
+async def legacy_analytics(db, current_user):
+    if current_user.role == "admin":
+        return {
+            "orders_by_status": (await db.execute(select(Order.status, func.count(Order.id)).group_by(Order.status))).all(),
+            "average_rating": await db.scalar(select(func.avg(Review.rating))),
+            "total_revenue": await db.scalar(select(func.sum(Order.total_price))),
+            "crops_by_category": (await db.execute(select(Crop.category, func.count(Crop.id)).group_by(Crop.category))).all(),
+        }
+    elif current_user.role == "farmer":
+        return {
+            "orders_by_status": (await db.execute(select(Order.status, func.count(Order.id)).join(Crop).filter(Crop.farmer_id == current_user.id).group_by(Order.status))).all(),
+            "average_rating": await db.scalar(select(func.avg(Review.rating)).filter(Review.farmer_id == current_user.id)),
+            "total_revenue": await db.scalar(select(func.sum(Order.total_price)).join(Crop).filter(Crop.farmer_id == current_user.id)),
+            "crops_by_category": (await db.execute(select(Crop.category, func.count(Crop.id)).filter(Crop.farmer_id == current_user.id).group_by(Crop.category))).all(),
+        }
+    else:
+        return {
+            "orders_by_status": (await db.execute(select(Order.status, func.count(Order.id)).filter(Order.buyer_id == current_user.id).group_by(Order.status))).all(),
+            "average_rating": await db.scalar(select(func.avg(Review.rating)).filter(Review.buyer_id == current_user.id)),
+            "total_spent": await db.scalar(select(func.sum(Order.total_price)).filter(Order.buyer_id == current_user.id)),
+        }
+
+async def measure(handler, user, iterations):
+    async with SessionLocal() as db:
+        await handler(db=db, current_user=user)  # warm up
+        with QueryCounter() as counter:
+            await handler(db=db, current_user=user)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            await handler(db=db, current_user=user)
+        elapsed = time.perf_counter() - start
+    return counter.count, elapsed / iterations * 1000
+
+async def main(args):
+    counts = await seed(orders=args.orders)
+    print("seeded", ", ".join(f"{n} {table}" for table, n in counts.items()))
+    engine.echo = False
+
+    async with SessionLocal() as db:
+        users = {
+            role: await db.scalar(select(User).filter(User.role == role).order_by(User.id))
+            for role in ("admin", "farmer", "buyer")
+        }
+
+    print(f"{'endpoint':<12} {'role':<7} {'queries':>15} {'ms/request':>21}")
+    for name, before, after in (
+        ("stats", legacy_stats, get_dashboard_stats),
+        ("analytics", legacy_analytics, get_dashboard_analytics),
+    ):
+        for role, user in users.items():
+            q_before, ms_before = await measure(before, user, args.iterations)
+            q_after, ms_after = await measure(after, user, args.iterations)
+            print(f"{name:<12} {role:<7} {q_before:>6} -> {q_after:<6} {ms_before:>9.2f} -> {ms_after:<9.2f}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--iterations", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,101 @@
+"""
+Fail if a hot query falls back to a full table scan on the seeded dataset.
+
+Each query below has the shape a router sends. Its plan is checked with
+EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (FORMAT JSON) (PostgreSQL, with
+enable_seqscan off so a small table can't hide a missing index). Exits 1
+on any scan, so it can gate CI.
+
+    python -m benchmarks.explain
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.explain --orders 50000
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from benchmarks.seed import seed
+
+from sqlalchemy import select, func, text
+
+from app.core.pagination import paginate
+from app.db.session import SessionLocal, engine
+from app.models.models import User, Crop, Order, Review, search_document
+
+# Tables that grow with usage; scanning users for the admin's role counts is expected
+HOT_TABLES = {"crops", "orders", "reviews"}
+
+def hot_queries(farmer_id: int, buyer_id: int, order_id: int):
+    first_page = ""
+    return {
+        "login by email": select(User).filter(User.email == "buyer1@bench.farmsync.app"),
+        "marketplace list": paginate(select(Crop).filter(Crop.published_to_marketplace == True), Crop, 0, 100, first_page),
+        "marketplace search filters": select(Crop).filter(
+            Crop.published_to_marketplace == True, Crop.category == "grain", Crop.price.between(10, 50)
+        ).order_by(Crop.price).limit(20),
+        "farmer orders": paginate(select(Order).join(Crop).filter(Crop.farmer_id == farmer_id), Order, 0, 100, first_page),
+        "buyer orders": paginate(select(Order).filter(Order.buyer_id == buyer_id), Order, 0, 100, first_page),
+        "farmer reviews": paginate(select(Review).filter(Review.farmer_id == farmer_id), Review, 0, 100, first_page),
+        "buyer reviews": paginate(select(Review).filter(Review.buyer_id == buyer_id), Review, 0, 100, first_page),
+        "review for order": select(Review).filter(Review.order_id == order_id),
+        "farmer crops by category": select(Crop.category, func.count(Crop.id)).filter(Crop.farmer_id == farmer_id).group_by(Crop.category),
+    }
+
+def search_query():
+    document = search_document(Crop.name, Crop.description)
+    return select(Crop).filter(
+        Crop.published_to_marketplace == True,
+        document.op("@@")(func.websearch_to_tsquery(text("'english'"), "rice")),
+    )
+
+def sqlite_scans(plan) -> list:
+    # detail is e.g. "SCAN orders" or "SEARCH orders USING INDEX ..."
+    return [row.detail for row in plan if row.detail.startswith("SCAN ") and "USING" not in row.detail
+            and row.detail.split()[1] in HOT_TABLES]
+
+def postgres_scans(plan) -> list:
+    scans, nodes = [], [json.loads(plan)[0]["Plan"] if isinstance(plan, str) else plan[0]["Plan"]]
+    while nodes:
+        node = nodes.pop()
+        if node["Node Type"] == "Seq Scan" and node.get("Relation Name") in HOT_TABLES:
+            scans.append(f"Seq Scan on {node['Relation Name']}")
+        nodes.extend(node.get("Plans", []))
+    return scans
+
+async def main(args) -> int:
+    counts = await seed(orders=args.orders)
+    print("seeded", ", ".join(f"{n} {table}" for table, n in counts.items()))
+    engine.echo = False
+
+    failures = 0
+    async with SessionLocal() as db:
+        farmer_id = await db.scalar(select(User.id).filter(User.role == "farmer").order_by(User.id))
+        buyer_id = await db.scalar(select(User.id).filter(User.role == "buyer").order_by(User.id))
+        order_id = await db.scalar(select(func.max(Order.id)))
+        queries = hot_queries(farmer_id, buyer_id, order_id)
+
+        postgres = db.bind.dialect.name == "postgresql"
+        if postgres:
+            await db.execute(text("ANALYZE"))
+            await db.execute(text("SET enable_seqscan = off"))
+            queries["marketplace full-text search"] = search_query()
+
+        for name, query in queries.items():
+            sql = str(query.compile(db.bind, compile_kwargs={"literal_binds": True}))
+            if postgres:
+                plan = await db.scalar(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                scans = postgres_scans(plan)
+            else:
+                plan = (await db.execute(text(f"EXPLAIN QUERY PLAN {sql}"))).all()
+                scans = sqlite_scans(plan)
+            failures += bool(scans)
+            print(f"{'SCAN' if scans else 'ok':<5} {name}" + (f"  ({'; '.join(scans)})" if scans else ""))
+
+    await engine.dispose()
+    print(f"{failures} of {len(queries)} hot queries scan a table")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, default=5000)
+    sys.exit(asyncio.run(main(parser.parse_args())))
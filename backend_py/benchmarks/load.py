@@ -0,0 +1,239 @@
+"""
+Load test of the real routers against a seeded local database: --concurrency
+virtual users (--farmer-share of them farmers, the rest buyers) loop over a
+weighted mix of requests for --duration seconds after a --warmup, then
+latency (p50/p95/p99) and requests/sec are reported per route.
+
+    buyers   browse and search the marketplace, open crops, list their orders,
+             place orders, check their dashboard, log in now and then
+    farmers  list incoming orders, accept pending ones, check dashboards
+
+Requests go through the app in-process (httpx.ASGITransport), so it runs
+offline; with --base-url they go to a running server instead, which must use
+the same database (DATABASE_URL=$BENCH_DATABASE_URL, after `--seed-only`).
+
+    python -m benchmarks.load --concurrency 32 --duration 20
+    python -m benchmarks.load --json load.json                     # keep results
+    python -m benchmarks.load --baseline load.json --max-regression 0.25
+
+Exits 1 on any 5xx response, and with --baseline when a route's p95 got more
+than --max-regression slower, or total requests/sec dropped by as much.
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from benchmarks.seed import seed, PASSWORD, CATEGORIES
+
+import httpx
+from sqlalchemy import select
+
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.models import Crop, User
+
+API = "/api/v1"
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        response = await client.request(method, API + path, **kwargs)
+        if self.recording:
+            self.latencies[route].append((time.perf_counter() - start) * 1000)
+            self.statuses[route][response.status_code] += 1
+        return response
+
+class Buyer:
+    def __init__(self, user: User, crop_ids: List[int], rng: random.Random):
+        self.user = user
+        self.headers = auth(user.email)
+        self.crop_ids = crop_ids
+        self.rng = rng
+
+    async def step(self, client, recorder: Recorder) -> None:
+        rng, r = self.rng, recorder
+        action = rng.choices(
+            ["browse", "search", "crop", "orders", "dashboard", "order", "login"],
+            weights=[25, 20, 15, 12, 10, 15, 3],
+        )[0]
+        if action == "browse":
+            await r.request(client, "GET /crops/", "GET", "/crops/", params={"limit": 50}, headers=self.headers)
+        elif action == "search":
+            params = {"category": rng.choice(CATEGORIES), "sort": rng.choice(["relevance", "price_asc", "newest"])}
+            if rng.random() < 0.5:
+                params["q"] = "fresh"
+            await r.request(client, "GET /crops/search", "GET", "/crops/search", params=params, headers=self.headers)
+        elif action == "crop":
+            await r.request(client, "GET /crops/{crop_id}", "GET", f"/crops/{rng.choice(self.crop_ids)}", headers=self.headers)
+        elif action == "orders":
+            await r.request(client, "GET /orders/", "GET", "/orders/", params={"limit": 50}, headers=self.headers)
+        elif action == "dashboard":
+            await r.request(client, "GET /dashboard/stats", "GET", "/dashboard/stats", headers=self.headers)
+        elif action == "order":
+            await r.request(client, "POST /orders/", "POST", "/orders/", headers=self.headers, json={
+                "crop_id": rng.choice(self.crop_ids), "buyer_id": self.user.id,
+                "quantity": rng.randint(1, 5), "status": "pending",
+            })
+        else:
+            await r.request(client, "POST /auth/login", "POST", "/auth/login",
+                            data={"username": self.user.email, "password": PASSWORD})
+
+class Farmer:
+    def __init__(self, user: User, rng: random.Random):
+        self.headers = auth(user.email)
+        self.rng = rng
+        self.pending: List[int] = []
+
+    async def step(self, client, recorder: Recorder) -> None:
+        rng, r = self.rng, recorder
+        action = rng.choices(["orders", "accept", "dashboard", "analytics"], weights=[35, 30, 20, 15])[0]
+        if action == "accept" and self.pending:
+            order_id = self.pending.pop(rng.randrange(len(self.pending)))
+            await r.request(client, "PUT /orders/{order_id}", "PUT", f"/orders/{order_id}",
+                            headers=self.headers, json={"status": "accepted"})
+        elif action in ("orders", "accept"):
+            response = await r.request(client, "GET /orders/", "GET", "/orders/", params={"limit": 50}, headers=self.headers)
+            if response.status_code == 200:
+                self.pending = [order["id"] for order in response.json() if order["status"] == "pending"]
+        elif action == "dashboard":
+            await r.request(client, "GET /dashboard/stats", "GET", "/dashboard/stats", headers=self.headers)
+        else:
+            await r.request(client, "GET /dashboard/analytics", "GET", "/dashboard/analytics", headers=self.headers)
+
+def report(recorder: Recorder, elapsed: float) -> dict:
+    routes = {}
+    for route in sorted(recorder.latencies):
+        samples = recorder.latencies[route]
+        statuses = recorder.statuses[route]
+        routes[route] = {
+            "requests": len(samples),
+            "rps": round(len(samples) / elapsed, 1),
+            "p50_ms": round(percentile(samples, 50), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "p99_ms": round(percentile(samples, 99), 2),
+            "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        }
+    everything = [ms for samples in recorder.latencies.values() for ms in samples]
+    total = {
+        "requests": len(everything),
+        "rps": round(len(everything) / elapsed, 1),
+        "p50_ms": round(percentile(everything, 50), 2),
+        "p95_ms": round(percentile(everything, 95), 2),
+        "p99_ms": round(percentile(everything, 99), 2),
+    }
+    return {"duration_s": round(elapsed, 2), "routes": routes, "total": total}
+
+def print_report(result: dict, concurrency: int) -> None:
+    print(f"{'route':<26} {'requests':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}   statuses"
+          f"   ({concurrency} users, {result['duration_s']:.0f} s)")
+    for route, stats in [*result["routes"].items(), ("total", result["total"])]:
+        statuses = " ".join(f"{code}:{count}" for code, count in stats.get("statuses", {}).items())
+        print(f"{route:<26} {stats['requests']:>8} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}   {statuses}")
+
+def regressions(result: dict, baseline: dict, tolerance: float) -> List[str]:
+    found = []
+    for route, stats in result["routes"].items():
+        before = baseline["routes"].get(route)
+        if before and stats["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            found.append(f"{route}: p95 {before['p95_ms']:.1f} -> {stats['p95_ms']:.1f} ms")
+    if result["total"]["rps"] < baseline["total"]["rps"] * (1 - tolerance):
+        found.append(f"total: {baseline['total']['rps']:.1f} -> {result['total']['rps']:.1f} req/s")
+    return found
+
+async def main(args) -> int:
+    counts = await seed(farmers=args.farmers, buyers=args.buyers, crops_per_farmer=args.crops_per_farmer, orders=args.orders)
+    print("seeded", ", ".join(f"{n} {table}" for table, n in counts.items()))
+    engine.echo = False
+    if args.seed_only:
+        return 0
+
+    async with SessionLocal() as db:
+        farmers = (await db.scalars(select(User).filter(User.role == "farmer"))).all()
+        buyers = (await db.scalars(select(User).filter(User.role == "buyer"))).all()
+        crop_ids = list((await db.scalars(select(Crop.id).filter(Crop.published_to_marketplace == True))).all())
+
+    rng = random.Random(args.seed)
+    farmer_users = max(1, round(args.concurrency * args.farmer_share)) if args.farmer_share else 0
+    users = [Farmer(farmers[n % len(farmers)], random.Random(rng.random())) for n in range(farmer_users)] + [
+        Buyer(buyers[n % len(buyers)], crop_ids, random.Random(rng.random()))
+        for n in range(args.concurrency - farmer_users)
+    ]
+
+    recorder = Recorder()
+    if args.base_url:
+        client = httpx.AsyncClient(base_url=args.base_url, timeout=30)
+    else:
+        # Unhandled errors come back as 500s and fail the run, as over the network
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30)
+    async with client:
+        async def run(user, until):
+            while time.perf_counter() < until:
+                await user.step(client, recorder)
+
+        await asyncio.gather(*(run(user, time.perf_counter() + args.warmup) for user in users))
+        recorder.recording = True
+        started = time.perf_counter()
+        await asyncio.gather(*(run(user, started + args.duration) for user in users))
+        elapsed = time.perf_counter() - started
+    await engine.dispose()
+
+    result = report(recorder, elapsed)
+    print_report(result, args.concurrency)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    server_errors = {
+        route: count for route, stats in result["routes"].items()
+        if (count := sum(n for code, n in stats["statuses"].items() if code.startswith("5")))
+    }
+    if server_errors:
+        print("server errors:", server_errors)
+        failed = True
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(result, json.load(f), args.max_regression)
+        for line in found:
+            print("REGRESSION", line)
+        print(f"vs {args.baseline}: {'regressed' if found else 'ok'} (tolerance {args.max_regression:.0%})")
+        failed = failed or bool(found)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--farmer-share", type=float, default=0.25)
+    parser.add_argument("--farmers", type=int, default=50)
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--crops-per-farmer", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--base-url", help="drive a running server instead of the app in-process")
+    parser.add_argument("--seed-only", action="store_true", help="seed the bench database and exit")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25)
+    sys.exit(asyncio.run(main(parser.parse_args())))
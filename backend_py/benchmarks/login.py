@@ -0,0 +1,71 @@
+"""
+Logins/sec for one worker under a burst of concurrent /auth/login calls, and
+how responsive the event loop stays meanwhile (latency of GET / probes).
+
+    python -m benchmarks.login --concurrency 32 --duration 10
+    BCRYPT_ROUNDS=10 PASSWORD_HASH_WORKERS=8 python -m benchmarks.login
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.seed import seed, PASSWORD
+
+import httpx
+
+from app.core.security import password_hasher
+from app.db.session import engine
+from app.main import app
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * pct / 100))] if samples else 0.0
+
+async def main(args):
+    await seed(farmers=10, buyers=90, crops_per_farmer=1, orders=0)
+    engine.echo = False
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        statuses = {}
+        login_ms, probe_ms = [], []
+
+        async def login(n):
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.post("/api/v1/auth/login", data={
+                    "username": f"buyer{n % 90}@bench.farmsync.app",
+                    "password": PASSWORD,
+                })
+                login_ms.append((time.perf_counter() - start) * 1000)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 503:
+                    await asyncio.sleep(0.05)
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                await client.get("/")
+                probe_ms.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.05)
+
+        await asyncio.gather(probe(), *(login(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    ok = statuses.get(200, 0)
+    print(f"concurrency {args.concurrency}, {elapsed:.1f}s, "
+          f"{password_hasher.workers} hash workers, max pending {password_hasher.max_pending}")
+    print(f"logins/sec     {ok / elapsed:.1f}  (statuses: {statuses})")
+    print(f"login latency  p50 {percentile(login_ms, 50):.1f} ms  p95 {percentile(login_ms, 95):.1f} ms")
+    print(f"GET / latency  p50 {percentile(probe_ms, 50):.1f} ms  p99 {percentile(probe_ms, 99):.1f} ms  "
+          f"max {max(probe_ms, default=0):.1f} ms  (mean {statistics.fmean(probe_ms or [0]):.1f} ms)")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
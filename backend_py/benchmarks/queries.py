@@ -0,0 +1,100 @@
+"""
+Query budgets of the hot read routes: each request below must run at most its
+budget of SQL statements however many rows it returns, so an N+1 (a lazy load
+per row, a count per item) fails the run instead of slipping into a release.
+Requests are made with a warm principal cache and a cold response cache, so
+the counts are those of the endpoint itself.
+
+    python -m benchmarks.queries
+    python -m benchmarks.queries --orders 5000     # same budgets, more rows
+
+Exits 1 when a route goes over its budget, printing the statements it ran.
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks.seed import seed
+
+import httpx
+from sqlalchemy import select
+
+from app.core.response_cache import CROP_LIST, FARMERS, crop_responses, crop_scope
+from app.core.security import create_access_token
+from app.db.query_counter import assert_max_queries
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.models import Crop, Order, Review, User
+
+# (role, path, budget); {crop_id}, {order_id} and {review_id} are filled in.
+# List budgets are the page query plus one selectinload per nested relationship.
+BUDGETS = [
+    ("buyer", "/crops/?limit=100", 2),
+    ("buyer", "/crops/?limit=100&expand=farmer", 2),
+    ("buyer", "/crops/{crop_id}", 1),
+    ("buyer", "/orders/?limit=100", 4),
+    ("farmer", "/orders/?limit=100", 4),
+    ("admin", "/orders/?limit=100", 4),
+    ("buyer", "/orders/{order_id}", 1),
+    ("buyer", "/reviews/?limit=100", 7),
+    ("admin", "/reviews/?limit=100", 7),
+    ("buyer", "/reviews/{review_id}", 1),
+    ("admin", "/dashboard/stats", 3),
+    ("farmer", "/dashboard/stats", 3),
+    ("buyer", "/dashboard/stats", 3),
+    ("admin", "/dashboard/analytics", 1),
+    ("farmer", "/dashboard/analytics", 2),
+    ("buyer", "/dashboard/analytics", 1),
+]
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+async def main(args) -> int:
+    await seed(farmers=args.farmers, buyers=args.buyers, crops_per_farmer=args.crops_per_farmer, orders=args.orders)
+    engine.echo = False
+
+    async with SessionLocal() as db:
+        order_id, buyer_id, crop_id, farmer_id = (await db.execute(
+            select(Order.id, Order.buyer_id, Crop.id, Crop.farmer_id).join(Crop).filter(Crop.published_to_marketplace == True)
+        )).first()
+        review_id = await db.scalar(select(Review.id).filter(Review.buyer_id == buyer_id))
+        buyer = await db.scalar(select(User.email).filter(User.id == buyer_id))
+        farmer = await db.scalar(select(User.email).filter(User.id == farmer_id))
+    ids = {"crop_id": crop_id, "order_id": order_id, "review_id": review_id}
+    headers = {role: auth(email) for role, email in (("admin", "admin@bench.farmsync.app"), ("buyer", buyer), ("farmer", farmer))}
+
+    failures = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for role in headers:
+            await client.get("/api/v1/users/me", headers=headers[role])  # caches the principal
+
+        print(f"{'role':<7} {'route':<34} {'queries':>7} {'budget':>6}")
+        for role, path, budget in BUDGETS:
+            if "{review_id}" in path and review_id is None:
+                continue
+            path = path.format(**ids)
+            await crop_responses.invalidate(CROP_LIST, FARMERS, crop_scope(crop_id))
+            try:
+                with assert_max_queries(budget) as counter:
+                    response = await client.get("/api/v1" + path, headers=headers[role])
+                error = None if response.status_code == 200 else f"status {response.status_code}"
+            except AssertionError as e:
+                error = str(e)
+            print(f"{role:<7} {path:<34} {counter.count:>7} {budget:>6}" + (f"  {error.splitlines()[0]}" if error else ""))
+            if error:
+                failures.append(f"{role} {path}: {error}")
+
+    await engine.dispose()
+    for failure in failures:
+        print("\nFAIL", failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--farmers", type=int, default=10)
+    parser.add_argument("--buyers", type=int, default=20)
+    parser.add_argument("--crops-per-farmer", type=int, default=20)
+    parser.add_argument("--orders", type=int, default=500)
+    sys.exit(asyncio.run(main(parser.parse_args())))
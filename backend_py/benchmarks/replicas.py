@@ -0,0 +1,130 @@
+"""
+Read-replica routing against a local two-database setup: the bench database
+is the primary, and a copy of it taken after seeding stands in for a replica
+(one that stops replicating at that moment, which makes lag visible). A
+second replica URL points at a path that can't be opened, to show a failing
+replica being taken out of rotation. Checks, by counting statements on each
+engine, that:
+
+    GET routes read from the replica, writes go to the primary
+    a user's reads stay on the primary right after their write, and go back
+        to the replica after REPLICA_READ_YOUR_WRITES_SECONDS
+    a request hitting the broken replica is served from the primary, and the
+        replica is skipped from then on
+    a replica whose pool is exhausted, or whose query fails (e.g. a statement
+        timeout), stays in rotation
+
+    python -m benchmarks.replicas
+
+Exits 1 when a check fails.
+"""
+import os
+import shutil
+
+# Before benchmarks.seed, which imports the app
+REPLICA_PATH = "./bench_replica.db"
+os.environ["DATABASE_REPLICA_URLS"] = f"sqlite:////nonexistent/replica.db,sqlite:///{REPLICA_PATH}"
+os.environ.setdefault("REPLICA_READ_YOUR_WRITES_SECONDS", "0.5")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import sys  # noqa: E402
+
+from benchmarks.seed import BENCH_DATABASE_URL, seed  # noqa: E402
+
+import httpx  # noqa: E402
+from sqlalchemy import event, exc, select  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.security import create_access_token  # noqa: E402
+from app.db.query_counter import QueryCounter  # noqa: E402
+from app.db.session import SessionLocal, engine, replicas  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models.models import Crop, User  # noqa: E402
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+async def main(args) -> int:
+    assert BENCH_DATABASE_URL.startswith("sqlite:///"), "the replica is a file copy of a SQLite bench database"
+    await seed(farmers=2, buyers=2, crops_per_farmer=2, orders=4)
+    engine.echo = False
+    shutil.copyfile(BENCH_DATABASE_URL.removeprefix("sqlite:///"), REPLICA_PATH)
+    broken, replica = (r.engine for r in replicas.replicas)
+
+    async with SessionLocal() as db:
+        buyer_id, buyer = (await db.execute(select(User.id, User.email).filter(User.role == "buyer"))).first()
+        crop_id = await db.scalar(select(Crop.id).filter(Crop.published_to_marketplace == True))
+    headers = auth(buyer)
+    failures = []
+
+    def check(name, ok, detail=""):
+        print(f"{'ok  ' if ok else 'FAIL'} {name} {detail}")
+        if not ok:
+            failures.append(name)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def get(path):
+            with QueryCounter(engine) as on_primary, QueryCounter(replica) as on_replica:
+                response = await client.get("/api/v1" + path, headers=headers)
+            return response, on_primary.count, on_replica.count
+
+        # Round-robin starts with the broken replica: that request falls back
+        # to the primary, and the replica is skipped from then on
+        response, primary, _ = await get("/orders/")
+        check("broken replica falls back to the primary", response.status_code == 200 and primary > 0,
+              f"(status {response.status_code}, primary {primary})")
+        check("broken replica taken out of rotation", not replicas.status()[0]["ok"])
+        await get("/orders/")  # principal lookup on the primary, now cached
+
+        response, primary, on_replica = await get("/orders/")
+        before = len(response.json())
+        check("GET reads from the replica", primary == 0 and on_replica > 0, f"(primary {primary}, replica {on_replica})")
+        response, primary, on_replica = await get("/dashboard/stats")
+        check("dashboard reads from the replica", primary == 0 and on_replica > 0, f"(primary {primary}, replica {on_replica})")
+
+        with QueryCounter(engine) as on_primary, QueryCounter(replica) as on_replica:
+            response = await client.post("/api/v1/orders/", headers=headers, json={
+                "crop_id": crop_id, "buyer_id": buyer_id, "quantity": 1, "status": "pending",
+            })
+        check("write goes to the primary", response.status_code == 200 and on_replica.count == 0,
+              f"(status {response.status_code}, primary {on_primary.count}, replica {on_replica.count})")
+
+        response, primary, on_replica = await get("/orders/")
+        check("read-your-writes: next read on the primary", primary > 0 and on_replica == 0 and len(response.json()) == before + 1,
+              f"(primary {primary}, replica {on_replica}, {len(response.json())} orders)")
+
+        await asyncio.sleep(settings.REPLICA_READ_YOUR_WRITES_SECONDS + 0.1)
+        response, primary, on_replica = await get("/orders/")
+        check("later reads back on the (lagging) replica", primary == 0 and on_replica > 0 and len(response.json()) == before,
+              f"(primary {primary}, replica {on_replica}, {len(response.json())} orders)")
+
+        # An exhausted pool is load, not a dead replica: the request falls back
+        # to the primary and the replica stays in rotation
+        def exhausted():
+            raise exc.TimeoutError("QueuePool limit reached, connection timed out")
+        replica.sync_engine.pool.connect, connect = exhausted, replica.sync_engine.pool.connect
+        response, primary, _ = await get("/orders/")
+        replica.sync_engine.pool.connect = connect
+        check("exhausted replica pool falls back to the primary", response.status_code == 200 and primary > 0,
+              f"(status {response.status_code}, primary {primary})")
+        check("exhausted replica stays in rotation", replicas.status()[1]["ok"])
+
+        # So is a failing query on a live connection
+        def statement_timeout(conn, cursor, statement, parameters, context, executemany):
+            raise exc.OperationalError(statement, parameters, Exception("canceling statement due to statement timeout"))
+        event.listen(replica.sync_engine, "before_cursor_execute", statement_timeout)
+        response, _, _ = await get("/orders/")
+        event.remove(replica.sync_engine, "before_cursor_execute", statement_timeout)
+        check("failed query on the replica is an error", response.status_code == 500, f"(status {response.status_code})")
+        check("replica with a failed query stays in rotation", replicas.status()[1]["ok"])
+
+    await replicas.dispose()
+    await engine.dispose()
+    os.remove(REPLICA_PATH)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sys.exit(asyncio.run(main(parser.parse_args())))
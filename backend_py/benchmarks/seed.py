@@ -0,0 +1,133 @@
+"""
+Seed a scratch database with a realistic marketplace for benchmarks.
+
+Benchmarks never touch the configured DATABASE_URL: importing this module
+points the app at BENCH_DATABASE_URL (a local SQLite file by default), so it
+must be imported before anything from `app`.
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+BENCH_DATABASE_URL = os.environ.get("BENCH_DATABASE_URL", "sqlite:///./bench.db")
+
+def setup_database() -> None:
+    os.environ["DATABASE_URL"] = BENCH_DATABASE_URL
+
+setup_database()
+
+from sqlalchemy import insert, func, select  # noqa: E402
+
+from app.core.security import get_password_hash  # noqa: E402
+from app.db import user_stats  # noqa: E402
+from app.db.session import engine, SessionLocal  # noqa: E402
+from app.models import models  # noqa: E402
+from app.models.models import User, Crop, Order, Review  # noqa: E402
+
+PASSWORD = "password"
+CATEGORIES = ["grain", "vegetable", "fruit", "pulse", "spice", "dairy"]
+UNITS = ["kg", "quintal", "dozen", "litre"]
+STATUSES = ["pending", "accepted", "rejected", "completed"]
+
+async def reset_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(models.BaseModel.metadata.drop_all)
+        await conn.run_sync(models.BaseModel.metadata.create_all)
+
+async def seed(
+    farmers: int = 50,
+    buyers: int = 200,
+    crops_per_farmer: int = 20,
+    orders: int = 5000,
+    seed: int = 42,
+) -> dict:
+    """
+    Drop and recreate the schema, then bulk-insert users, crops, orders and reviews.
+    Every user's password is PASSWORD; emails are admin@, farmer{n}@ and
+    buyer{n}@bench.farmsync.app.
+    """
+    rng = random.Random(seed)
+    await reset_schema()
+    password = get_password_hash(PASSWORD)
+    start = datetime.utcnow() - timedelta(days=365)
+
+    def created(i: int, total: int) -> datetime:
+        return start + timedelta(seconds=int(365 * 86400 * i / total))
+
+    async with SessionLocal() as db:
+        users = [
+            {"name": "Admin", "email": "admin@bench.farmsync.app", "password": password, "role": "admin"}
+        ] + [
+            {"name": f"Farmer {n}", "email": f"farmer{n}@bench.farmsync.app", "password": password, "role": "farmer"}
+            for n in range(farmers)
+        ] + [
+            {"name": f"Buyer {n}", "email": f"buyer{n}@bench.farmsync.app", "password": password, "role": "buyer"}
+            for n in range(buyers)
+        ]
+        for i, user in enumerate(users):
+            user["created_at"] = user["updated_at"] = created(i, len(users))
+        await db.execute(insert(User), users)
+        farmer_ids = list((await db.scalars(select(User.id).filter(User.role == "farmer"))).all())
+        buyer_ids = list((await db.scalars(select(User.id).filter(User.role == "buyer"))).all())
+
+        crops = []
+        for i in range(farmers * crops_per_farmer):
+            crops.append({
+                "name": f"Crop {i}",
+                "description": f"Fresh {rng.choice(CATEGORIES)} from farm {i % farmers}",
+                "quantity": rng.randint(100, 10000),
+                "price": rng.randint(10, 500),
+                "unit": rng.choice(UNITS),
+                "category": rng.choice(CATEGORIES),
+                "published_to_marketplace": rng.random() < 0.8,
+                "farmer_id": farmer_ids[i % farmers],
+                "created_at": created(i, farmers * crops_per_farmer),
+                "updated_at": created(i, farmers * crops_per_farmer),
+            })
+        await db.execute(insert(Crop), crops)
+        crop_rows = (await db.execute(select(Crop.id, Crop.price, Crop.farmer_id))).all()
+
+        order_rows = []
+        for i in range(orders):
+            crop = rng.choice(crop_rows)
+            quantity = rng.randint(1, 20)
+            order_rows.append({
+                "quantity": quantity,
+                "unit_price": crop.price,
+                "total_price": quantity * crop.price,
+                "status": rng.choice(STATUSES),
+                "buyer_id": rng.choice(buyer_ids),
+                "crop_id": crop.id,
+                "created_at": created(i, orders),
+                "updated_at": created(i, orders),
+            })
+        if order_rows:
+            await db.execute(insert(Order), order_rows)
+
+        completed = (await db.execute(
+            select(Order.id, Order.buyer_id, Crop.farmer_id, Order.created_at)
+            .join(Crop)
+            .filter(Order.status == "completed")
+        )).all()
+        reviews = [
+            {
+                "rating": rng.randint(1, 5),
+                "comment": "Good produce",
+                "buyer_id": order.buyer_id,
+                "farmer_id": order.farmer_id,
+                "order_id": order.id,
+                "created_at": order.created_at,
+                "updated_at": order.created_at,
+            }
+            for order in completed
+            if rng.random() < 0.6
+        ]
+        if reviews:
+            await db.execute(insert(Review), reviews)
+        await db.commit()
+        await user_stats.rebuild(db)
+
+        return {
+            model.__tablename__: await db.scalar(select(func.count(model.id)))
+            for model in (User, Crop, Order, Review)
+        }
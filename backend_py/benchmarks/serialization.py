@@ -0,0 +1,75 @@
+"""
+Per-row cost of serializing each response schema of app.schemas.schemas from
+ORM rows, as loaded by the list endpoints, along three paths:
+
+    fastapi   response_model: validate, dump to Python, encode with json
+    +orjson   the same with FastJSONResponse (settings.FAST_JSON_RESPONSES)
+    adapter   app.core.serialization.dump_rows: pre-built TypeAdapter to bytes
+
+    python -m benchmarks.serialization --rows 100 --repeat 50
+"""
+import argparse
+import asyncio
+import time
+from typing import List
+
+from benchmarks.seed import seed
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import select
+
+from app.core import serialization
+from app.core.serialization import FastJSONResponse, dump_rows
+from app.db import loaders
+from app.db.session import SessionLocal, engine
+from app.models.models import Crop, Order, Review, User
+from app.schemas import schemas
+
+CASES = [
+    (schemas.User, User, (), serialization.user_list),
+    (schemas.Crop, Crop, loaders.CROP_LIST, serialization.crop_list),
+    (schemas.Order, Order, loaders.ORDER_LIST, serialization.order_list),
+    (schemas.Review, Review, loaders.REVIEW_LIST, serialization.review_list),
+]
+
+async def best_of(repeat, fn):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def main(args):
+    await seed(farmers=20, buyers=100, crops_per_farmer=10, orders=2000)
+    engine.echo = False
+    print(f"{'schema':8} {'fastapi':>10} {'+orjson':>10} {'adapter':>10}   (us per row, best of {args.repeat}, {args.rows} rows)")
+    async with SessionLocal() as db:
+        for schema, model, options, adapter in CASES:
+            rows = (await db.scalars(select(model).options(*options).limit(args.rows))).all()
+            field = create_response_field(name=f"Response_{schema.__name__}", type_=List[schema])
+
+            def through_fastapi(response_class):
+                async def run():
+                    content = await serialize_response(field=field, response_content=rows, is_coroutine=True)
+                    return response_class(content).body
+                return run
+
+            async def through_adapter():
+                return dump_rows(adapter, rows)
+
+            assert (await through_fastapi(JSONResponse)()) == (await through_adapter()), schema.__name__
+            timings = [
+                await best_of(args.repeat, fn) * 1e6 / len(rows)
+                for fn in (through_fastapi(JSONResponse), through_fastapi(FastJSONResponse), through_adapter)
+            ]
+            print(f"{schema.__name__:8} " + " ".join(f"{timing:10.1f}" for timing in timings))
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
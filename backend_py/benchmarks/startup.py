@@ -0,0 +1,76 @@
+"""
+Cold start of `app.main:app`: a fresh interpreter is spawned per run and
+timed from exec to import done, startup (lifespan) done, first response, and
+readiness (/readyz answering 200 once the background database probe passed).
+Exits 1 when the median time to first response misses --target-ms.
+
+    python -m benchmarks.startup --runs 5 --target-ms 1500
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+MILESTONES = ["import", "startup", "first response", "ready"]
+
+def child(spawned: float) -> None:
+    elapsed = lambda: (time.time() - spawned) * 1000  # noqa: E731
+    timings = {}
+
+    from app.main import app
+    timings["import"] = elapsed()
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            timings["startup"] = elapsed()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                await client.get("/")
+                timings["first response"] = elapsed()
+                while (await client.get("/readyz")).status_code != 200:
+                    await asyncio.sleep(0.005)
+                timings["ready"] = elapsed()
+
+    asyncio.run(run())
+    print(json.dumps(timings))
+
+async def prepare() -> None:
+    from benchmarks.seed import seed
+    await seed(farmers=1, buyers=1, crops_per_farmer=1, orders=0)
+    from app.db.session import engine
+    await engine.dispose()
+
+def main(args) -> int:
+    asyncio.run(prepare())  # also points DATABASE_URL at the bench database for the children
+    runs = []
+    for _ in range(args.runs):
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.startup", "--child", repr(time.time())],
+            capture_output=True, text=True, check=True,
+        )
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    print(f"{'milestone':<18} {'median ms':>10} {'max ms':>8}   ({args.runs} cold starts)")
+    for milestone in MILESTONES:
+        samples = [run[milestone] for run in runs]
+        print(f"{milestone:<18} {statistics.median(samples):>10.0f} {max(samples):>8.0f}")
+    first_response = statistics.median(run["first response"] for run in runs)
+    ok = first_response <= args.target_ms
+    print(f"first response {first_response:.0f} ms, target {args.target_ms:.0f} ms: {'ok' if ok else 'MISSED'}")
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=1500)
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child)
+    else:
+        sys.exit(main(args))
@@ -0,0 +1,147 @@
+"""
+Hammer one crop with concurrent orders and accepts and prove it is never
+oversold. A negative order must be refused by the API and by the stock layer
+itself. Then every buyer orders --quantity units at once, and the farmer accepts
+one order --repeat times at once (it must be taken from stock only once), then
+every other order that got a reservation, all concurrently. For comparison,
+the same accepts are replayed with the original read-check-write logic.
+
+    python -m benchmarks.stock --buyers 64 --stock 100 --quantity 3
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.stock --buyers 200
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.seed import seed
+
+import httpx
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
+from app.core.security import create_access_token
+from app.db import stock
+from app.db.session import SessionLocal, engine
+from app.main import app
+from app.models.models import Crop, User
+
+def auth(email):
+    return {"Authorization": f"Bearer {create_access_token(data={'sub': email})}"}
+
+async def reset_crop(crop_id, stock):
+    async with SessionLocal() as db:
+        await db.execute(update(Crop).where(Crop.id == crop_id).values(
+            quantity=stock, reserved_quantity=0, published_to_marketplace=True,
+        ))
+        await db.commit()
+
+async def crop_state(crop_id):
+    async with SessionLocal() as db:
+        return (await db.execute(select(Crop.quantity, Crop.reserved_quantity).filter(Crop.id == crop_id))).one()
+
+async def legacy_accept(crop_id, quantity):
+    # The original update_order: check in Python, then write the computed value
+    async with SessionLocal() as db:
+        crop = await db.get(Crop, crop_id)
+        if crop.quantity < quantity:
+            return False
+        await asyncio.sleep(0)  # other requests interleave at every await of a handler
+        crop.quantity -= quantity
+        await db.commit()
+        return True
+
+def tally(responses):
+    statuses = {}
+    for response in responses:
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    return statuses
+
+async def main(args) -> int:
+    await seed(farmers=1, buyers=args.buyers, crops_per_farmer=1, orders=0)
+    engine.echo = False
+    async with SessionLocal() as db:
+        crop_id = await db.scalar(select(Crop.id))
+        buyers = (await db.scalars(select(User.email).filter(User.role == "buyer"))).all()
+    await reset_crop(crop_id, args.stock)
+    farmer = auth("farmer0@bench.farmsync.app")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # A negative quantity would add stock instead of claiming it
+        negative = await client.post("/api/v1/orders/", headers=auth(buyers[0]), json={
+            "quantity": -100, "status": "pending", "buyer_id": 0, "crop_id": crop_id,
+        })
+        async with SessionLocal() as db:
+            try:
+                await stock.reserve(db, crop_id, -100)
+                refused = False
+            except HTTPException:
+                refused = True
+            await db.rollback()
+        quantity, reserved = await crop_state(crop_id)
+        negative_claimed = negative.status_code != 422 or not refused or quantity - reserved != args.stock
+        print(f"negative order of -100: API {negative.status_code}, stock layer {'refused' if refused else 'ACCEPTED'}; "
+              f"available {quantity - reserved:g}" + (" (STOCK ADDED)" if negative_claimed else ""))
+
+        start = time.perf_counter()
+        placed = await asyncio.gather(*(
+            client.post("/api/v1/orders/", headers=auth(email), json={
+                "quantity": args.quantity, "total_price": args.quantity, "status": "pending",
+                "buyer_id": 0, "crop_id": crop_id,
+            })
+            for email in buyers
+        ))
+        reserve_ms = (time.perf_counter() - start) * 1000
+        quantity, reserved = await crop_state(crop_id)
+        order_ids = [response.json()["id"] for response in placed if response.status_code == 200]
+        print(f"reserve  {len(buyers)} concurrent orders of {args.quantity} against {args.stock}: "
+              f"{tally(placed)} in {reserve_ms:.0f} ms; reserved {reserved:g}, available {quantity - reserved:g}")
+
+        repeated = await asyncio.gather(*(
+            client.put(f"/api/v1/orders/{order_ids[0]}", headers=farmer, json={"status": "accepted"})
+            for _ in range(args.repeat)
+        ))
+        repeat_quantity, repeat_reserved = await crop_state(crop_id)
+        double_taken = repeat_quantity != args.stock - args.quantity or repeat_reserved != reserved - args.quantity
+        print(f"repeat   {args.repeat} concurrent accepts of one order: {tally(repeated)}; "
+              f"stock {repeat_quantity:g}, reserved {repeat_reserved:g}" + (" (TAKEN TWICE)" if double_taken else ""))
+
+        start = time.perf_counter()
+        accepted = await asyncio.gather(*(
+            client.put(f"/api/v1/orders/{order_id}", headers=farmer, json={"status": "accepted"})
+            for order_id in order_ids[1:]
+        ))
+        accept_ms = (time.perf_counter() - start) * 1000
+        final_quantity, final_reserved = await crop_state(crop_id)
+        taken = sum(args.quantity for response in [repeated[0], *accepted] if response.status_code == 200)
+        print(f"accept   {len(order_ids) - 1} concurrent accepts: {tally(accepted)} in {accept_ms:.0f} ms; "
+              f"stock {final_quantity:g}, reserved {final_reserved:g}")
+
+    oversold = (
+        negative_claimed
+        or double_taken
+        or len(order_ids) * args.quantity > args.stock
+        or final_quantity < 0
+        or final_reserved != 0
+        or final_quantity != args.stock - taken
+    )
+
+    await reset_crop(crop_id, args.stock)
+    results = await asyncio.gather(*(legacy_accept(crop_id, args.quantity) for _ in buyers), return_exceptions=True)
+    legacy_quantity, _ = await crop_state(crop_id)
+    legacy_sold = sum(args.quantity for result in results if result is True)
+    print(f"legacy   {len(buyers)} concurrent read-check-write accepts: sold {legacy_sold:g} of {args.stock}, "
+          f"stock left {legacy_quantity:g}" + (" (OVERSOLD)" if legacy_sold > args.stock or legacy_sold != args.stock - legacy_quantity else ""))
+
+    await engine.dispose()
+    print("reservations: OVERSOLD" if oversold else "reservations: no oversell")
+    return 1 if oversold else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--buyers", type=int, default=64)
+    parser.add_argument("--stock", type=float, default=100)
+    parser.add_argument("--quantity", type=float, default=3)
+    parser.add_argument("--repeat", type=int, default=8, help="concurrent accepts of the same order")
+    sys.exit(asyncio.run(main(parser.parse_args())))
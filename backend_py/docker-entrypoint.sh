@@ -0,0 +1,10 @@
+#!/bin/sh
+# Bring the schema up to date before starting the app. Set
+# MIGRATE_ON_START=0 when migrations run as a separate deploy step.
+set -e
+
+if [ "${MIGRATE_ON_START:-1}" = "1" ]; then
+    alembic upgrade head
+fi
+
+exec "$@"
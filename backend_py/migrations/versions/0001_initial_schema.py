@@ -0,0 +1,100 @@
+"""Initial schema: users, crops, orders and reviews
+
+Databases created by the old create_all() startup already have these tables;
+mark them as migrated with `alembic stamp 0001` before upgrading.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def timestamps():
+    return [
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    ]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'users',
+        *timestamps(),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('email', sa.String(length=100), nullable=False),
+        sa.Column('password', sa.String(length=100), nullable=False),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('phone_number', sa.String(length=20), nullable=True),
+        sa.CheckConstraint("role IN ('farmer', 'buyer', 'admin')", name='valid_role'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+    )
+    op.create_index('ix_users_id', 'users', ['id'])
+
+    op.create_table(
+        'crops',
+        *timestamps(),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('quantity', sa.Float(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('unit', sa.String(length=20), nullable=False),
+        sa.Column('category', sa.String(length=50), nullable=False),
+        sa.Column('photo', sa.String(length=255), nullable=True),
+        sa.Column('published_to_marketplace', sa.Boolean(), nullable=True),
+        sa.Column('farmer_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_crops_id', 'crops', ['id'])
+
+    op.create_table(
+        'orders',
+        *timestamps(),
+        sa.Column('quantity', sa.Float(), nullable=False),
+        sa.Column('total_price', sa.Float(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('buyer_id', sa.Integer(), nullable=True),
+        sa.Column('crop_id', sa.Integer(), nullable=True),
+        sa.CheckConstraint("status IN ('pending', 'accepted', 'rejected', 'completed')", name='valid_status'),
+        sa.ForeignKeyConstraint(['buyer_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['crop_id'], ['crops.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_orders_id', 'orders', ['id'])
+
+    op.create_table(
+        'reviews',
+        *timestamps(),
+        sa.Column('rating', sa.Integer(), nullable=False),
+        sa.Column('comment', sa.Text(), nullable=True),
+        sa.Column('buyer_id', sa.Integer(), nullable=True),
+        sa.Column('farmer_id', sa.Integer(), nullable=True),
+        sa.Column('order_id', sa.Integer(), nullable=True),
+        sa.CheckConstraint('rating >= 1 AND rating <= 5', name='valid_rating'),
+        sa.ForeignKeyConstraint(['buyer_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['farmer_id'], ['users.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_reviews_id', 'reviews', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('reviews')
+    op.drop_table('orders')
+    op.drop_table('crops')
+    op.drop_table('users')
@@ -0,0 +1,46 @@
+"""Per-user dashboard counters
+
+Fill the table after upgrading with `python -m app.db.user_stats`.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COUNTERS = [
+    ('total_crops', sa.Integer()),
+    ('total_orders', sa.Integer()),
+    ('pending_orders', sa.Integer()),
+    ('accepted_orders', sa.Integer()),
+    ('rejected_orders', sa.Integer()),
+    ('completed_orders', sa.Integer()),
+    ('revenue', sa.Float()),
+    ('total_reviews', sa.Integer()),
+    ('rating_sum', sa.Integer()),
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        *(sa.Column(name, type_, nullable=False, server_default='0') for name, type_ in COUNTERS),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_stats')
@@ -0,0 +1,57 @@
+"""Indexes for the list, dashboard and marketplace query shapes
+
+Role-scoped lists filter on a foreign key and page newest first on
+(created_at, id); marketplace queries only read published crops.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PUBLISHED = sa.text('published_to_marketplace = true')
+
+INDEXES = [
+    ('ix_users_created_at_id', 'users', ['created_at', 'id'], {}),
+    ('ix_crops_published_created_at_id', 'crops', ['created_at', 'id'],
+     {'postgresql_where': PUBLISHED, 'sqlite_where': PUBLISHED}),
+    ('ix_crops_published_category_price', 'crops', ['category', 'price'],
+     {'postgresql_where': PUBLISHED, 'sqlite_where': PUBLISHED}),
+    ('ix_crops_farmer_id_category', 'crops', ['farmer_id', 'category'], {}),
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id'], {}),
+    ('ix_orders_buyer_id_created_at_id', 'orders', ['buyer_id', 'created_at', 'id'], {}),
+    ('ix_orders_crop_id_created_at_id', 'orders', ['crop_id', 'created_at', 'id'], {}),
+    ('ix_reviews_created_at_id', 'reviews', ['created_at', 'id'], {}),
+    ('ix_reviews_buyer_id_created_at_id', 'reviews', ['buyer_id', 'created_at', 'id'], {}),
+    ('ix_reviews_farmer_id_created_at_id', 'reviews', ['farmer_id', 'created_at', 'id'], {}),
+    ('ix_reviews_order_id', 'reviews', ['order_id'], {}),
+]
+
+# Same expression as app.models.models.search_document, so searches can use it
+SEARCH_DOCUMENT = "to_tsvector('english', (coalesce(name, '') || ' ') || coalesce(description, ''))"
+
+
+def upgrade() -> None:
+    for name, table, columns, options in INDEXES:
+        op.create_index(name, table, columns, **options)
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_crops_search', 'crops', [sa.text(SEARCH_DOCUMENT)],
+                        postgresql_using='gin', postgresql_where=PUBLISHED)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('ix_crops_search', table_name='crops')
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
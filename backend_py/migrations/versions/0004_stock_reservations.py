@@ -0,0 +1,38 @@
+"""Stock reservations held by pending orders
+
+Existing pending orders start without a reservation; accepting them takes
+stock as before.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HELD = sa.text("status = 'pending' AND reserved_until IS NOT NULL")
+
+
+def upgrade() -> None:
+    op.add_column('crops', sa.Column('reserved_quantity', sa.Float(), nullable=False, server_default='0'))
+    op.add_column('orders', sa.Column('reserved_until', sa.DateTime(timezone=True), nullable=True))
+    op.create_index('ix_orders_pending_reserved_until', 'orders', ['reserved_until'],
+                    postgresql_where=HELD, sqlite_where=HELD)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_orders_pending_reserved_until', table_name='orders')
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('reserved_until')
+    with op.batch_alter_table('crops') as batch_op:
+        batch_op.drop_column('reserved_quantity')
@@ -0,0 +1,45 @@
+"""Fixed-point money columns and order price snapshots
+
+Prices, order totals and revenue counters become NUMERIC(12, 2), rounding
+existing values to the cent. Existing orders get no unit_price; new orders
+record the crop price they were placed at.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONEY_COLUMNS = [
+    ('crops', 'price', dict(existing_nullable=False)),
+    ('orders', 'total_price', dict(existing_nullable=False)),
+    ('user_stats', 'revenue', dict(existing_nullable=False, existing_server_default='0')),
+]
+
+
+def upgrade() -> None:
+    for table, column, existing in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.Numeric(12, 2), existing_type=sa.Float(),
+                                  postgresql_using=f'round({column}::numeric, 2)', **existing)
+    op.add_column('orders', sa.Column('unit_price', sa.Numeric(12, 2), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('unit_price')
+    for table, column, existing in MONEY_COLUMNS:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column(column, type_=sa.Float(), existing_type=sa.Numeric(12, 2),
+                                  postgresql_using=f'{column}::double precision', **existing)